@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Offline load test for /api/chat.
+
+Starts main.app in a subprocess (uvicorn) wired to local stand-ins from
+benchmarks/fakes.py: a scripted OpenAI-compatible LLM, SearXNG, n8n
+webhooks, web pages and an in-memory agent_configs table. No network
+access or API keys are needed.
+
+Drives a mix of scenarios (direct answers, one tool, multi-tool turns,
+auto-routing, webhooks) at a fixed concurrency and reports p50/p95/p99
+latency, RPS, errors, server memory and the mean time per hot-path stage
+from /metrics.
+
+    python benchmarks/chat_load.py --requests 500 --concurrency 32 --output chat.json
+    python benchmarks/chat_load.py --llm-latency-ms 50 --scenarios multi_tool,auto_route
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.fakes import BENCH_AGENTS, InMemorySupabase, StubHandler, StubSettings
+
+# name -> (agent_slug, message template)
+SCENARIOS = {
+    "direct": ("general", "What is the capital of France? #{i}"),
+    "one_tool": ("general", "[[tools:web_search]] Latest news about solar power #{i}"),
+    "multi_tool": ("researcher", "[[tools:web_search,web_scraper|web_scraper_batch]] Compare heat pumps #{i}"),
+    "auto_route": ("auto", "[[tools:web_search]] Please do deep web research on sources for battery recycling #{i}"),
+    "webhook": ("automation", "[[tools:n8n_webhook]] Send the weekly report email #{i}"),
+}
+
+STAGE_LINE_RE = re.compile(r'^stage_duration_seconds_(sum|count)\{stage="([^"]*)",target="([^"]*)"\} (\S+)$')
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(latencies: List[float], elapsed: float, errors: Dict[str, int]) -> Dict:
+    if not latencies:
+        return {"requests": 0, "errors": errors}
+    return {
+        "requests": len(latencies),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(max(latencies) * 1000, 2),
+        "errors": errors,
+    }
+
+
+def rss_kb(pid: int) -> Optional[int]:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def stage_means(metrics_text: str) -> Dict[str, float]:
+    """Mean milliseconds per stage (all targets combined) from /metrics."""
+    sums: Dict[str, float] = {}
+    counts: Dict[str, float] = {}
+    for line in metrics_text.splitlines():
+        match = STAGE_LINE_RE.match(line)
+        if not match:
+            continue
+        kind, stage, _, value = match.groups()
+        bucket = sums if kind == "sum" else counts
+        bucket[stage] = bucket.get(stage, 0.0) + float(value)
+    return {stage: round(sums[stage] / counts[stage] * 1000, 2) for stage in sums if counts.get(stage)}
+
+
+# ---------------------------------------------------------------------------
+# Server side (--serve)
+
+
+def serve(port: int, stub_url: str) -> None:
+    """Run main.app against the stand-ins. Environment must be set before importing main."""
+    os.environ.update({
+        "OPENAI_API_KEY": "bench",
+        "OPENAI_API_BASE": f"{stub_url}/v1",
+        "SEARX_HOST": stub_url,
+        "N8N_HOST": stub_url,
+        "N8N_CALLBACK_BASE_URL": f"http://127.0.0.1:{port}",
+        # Nothing listens here; the realtime listener fails fast and TTLs apply
+        "SUPABASE_URL": "http://127.0.0.1:9",
+        "SUPABASE_SERVICE_ROLE_KEY": "bench",
+        "REDIS_URL": "",
+        "LITELLM_LOCAL_MODEL_COST_MAP": "True",
+        "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING"),
+    })
+
+    import uvicorn
+    from core import supabase_client
+
+    # Before main is imported, so config_loader and the orchestrator's
+    # catalog both pick it up
+    supabase_client.set_supabase(InMemorySupabase(BENCH_AGENTS))
+    import main
+
+    uvicorn.run(main.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+# ---------------------------------------------------------------------------
+# Driver
+
+
+async def wait_ready(client, base_url: str, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get(f"{base_url}/health")).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("Backend did not become ready")
+
+
+async def run_load(client, base_url: str, plan: List[str], concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: Dict[str, List[float]] = {name: [] for name in set(plan)}
+    errors: Dict[str, Dict[str, int]] = {name: {} for name in set(plan)}
+
+    async def one(i: int, name: str):
+        slug, template = SCENARIOS[name]
+        body = {"messages": [{"role": "user", "content": template.format(i=i)}], "agent_slug": slug}
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await client.post(f"{base_url}/api/chat", json=body)
+                status = str(response.status_code)
+            except Exception as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - start
+        if status == "200":
+            latencies[name].append(elapsed)
+        else:
+            errors[name][status] = errors[name].get(status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i, name) for i, name in enumerate(plan)))
+    return latencies, errors, time.perf_counter() - start
+
+
+async def drive(args) -> Dict:
+    import httpx
+
+    StubSettings.llm_latency = args.llm_latency_ms / 1000.0
+    StubSettings.search_latency = args.tool_latency_ms / 1000.0
+    StubSettings.webhook_latency = args.tool_latency_ms / 1000.0
+    StubSettings.page_latency = args.tool_latency_ms / 1000.0
+
+    stub = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    stub.daemon_threads = True
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    stub_url = f"http://127.0.0.1:{stub.server_address[1]}"
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve", "--port", str(args.port), "--stub-url", stub_url],
+        cwd=BACKEND_DIR,
+    )
+
+    memory = {"samples": []}
+    sampling = True
+
+    async def sample_memory():
+        while sampling:
+            value = rss_kb(server.pid)
+            if value is not None:
+                memory["samples"].append(value)
+            await asyncio.sleep(0.2)
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    plan = [scenarios[i % len(scenarios)] for i in range(args.requests)]
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+            await wait_ready(client, base_url)
+            idle_rss = rss_kb(server.pid)
+
+            # Warm caches, pools and lazily built tool sets before measuring
+            await run_load(client, base_url, [scenarios[i % len(scenarios)] for i in range(args.warmup)], args.concurrency)
+
+            sampler = asyncio.ensure_future(sample_memory())
+            latencies, errors, elapsed = await run_load(client, base_url, plan, args.concurrency)
+            sampling = False
+            await sampler
+
+            metrics_text = (await client.get(f"{base_url}/metrics")).text
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+        stub.shutdown()
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    all_errors: Dict[str, int] = {}
+    for per_scenario in errors.values():
+        for status, count in per_scenario.items():
+            all_errors[status] = all_errors.get(status, 0) + count
+
+    return {
+        "benchmark": "chat_load",
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "params": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "warmup": args.warmup,
+            "scenarios": scenarios,
+            "llm_latency_ms": args.llm_latency_ms,
+            "tool_latency_ms": args.tool_latency_ms,
+        },
+        "overall": summarize(all_latencies, elapsed, all_errors),
+        "scenarios": {name: summarize(latencies[name], elapsed, errors[name]) for name in sorted(latencies)},
+        "server_memory_kb": {
+            "idle_rss": idle_rss,
+            "peak_rss": max(memory["samples"]) if memory["samples"] else None,
+            "final_rss": memory["samples"][-1] if memory["samples"] else None,
+        },
+        "stage_mean_ms": stage_means(metrics_text),
+        "stub_calls": dict(StubSettings.calls),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated subset of: " + ", ".join(SCENARIOS))
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0)
+    parser.add_argument("--tool-latency-ms", type=float, default=50.0)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--stub-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, args.stub_url)
+        return
+
+    unknown = [s for s in args.scenarios.split(",") if s.strip() and s.strip() not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)}")
+
+    results = asyncio.run(drive(args))
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
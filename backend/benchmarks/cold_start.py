@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark: import time of the backend and voice worker modules
+(python -X importtime, fresh interpreter per run) and, for each
+STARTUP_WARMUP mode, the time from process start until /health answers and
+until the chat path is warm (startup_warmup shows up in /metrics).
+
+Runs offline: Supabase points at a closed port and Redis is disabled.
+
+    python benchmarks/cold_start.py --runs 5 --output cold_start.json
+    python benchmarks/cold_start.py --modules main,voice_agent --modes background,eager
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import Dict, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BENCH_ENV = {
+    "SUPABASE_URL": "http://127.0.0.1:9",
+    "SUPABASE_SERVICE_ROLE_KEY": "bench",
+    "OPENAI_API_KEY": "bench",
+    "REDIS_URL": "",
+    # LiteLLM otherwise downloads its model cost map at import
+    "LITELLM_LOCAL_MODEL_COST_MAP": "True",
+    "LOG_LEVEL": "WARNING",
+}
+
+
+def bench_env(**extra: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update(BENCH_ENV)
+    env.update(extra)
+    return env
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_importtime(stderr: str, max_depth: int = 1) -> Dict[str, int]:
+    """
+    Cumulative microseconds per import from -X importtime output, for
+    top-level imports and the modules they import directly.
+    """
+    totals: Dict[str, int] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        # Nested imports are indented two spaces per level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth > max_depth:
+            continue
+        totals[name.strip()] = totals.get(name.strip(), 0) + int(cumulative)
+    return totals
+
+
+def measure_import(module: str, runs: int, top: int) -> Dict:
+    wall: List[float] = []
+    breakdown: Dict[str, int] = {}
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            cwd=BACKEND_DIR, env=bench_env(), capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            error = (proc.stderr.strip().splitlines() or ["failed"])[-1]
+            return {"module": module, "error": error}
+        wall.append(float(proc.stdout.strip().splitlines()[-1]))
+        breakdown = parse_importtime(proc.stderr)
+
+    heaviest = sorted(breakdown.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {
+        "module": module,
+        "runs": runs,
+        "median_ms": round(statistics.median(wall) * 1000, 1),
+        "min_ms": round(min(wall) * 1000, 1),
+        # From the last run: the module itself and what it imports directly
+        "heaviest_imports_ms": {name: round(us / 1000, 1) for name, us in heaviest},
+    }
+
+
+def _get(url: str, timeout: float = 1.0) -> Optional[str]:
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            return response.read().decode("utf-8")
+    except Exception:
+        return None
+
+
+def measure_startup(mode: str, port: int, timeout: float) -> Dict:
+    """Milliseconds from spawning uvicorn until /health answers and until the chat path is warm."""
+    base_url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=bench_env(STARTUP_WARMUP=mode),
+    )
+    result: Dict = {"mode": mode}
+    try:
+        deadline = started + timeout
+        while time.perf_counter() < deadline and "health_ms" not in result:
+            if _get(f"{base_url}/health") is not None:
+                result["health_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            elif server.poll() is not None:
+                result["error"] = f"server exited with {server.returncode}"
+                return result
+            else:
+                time.sleep(0.01)
+
+        # lazy mode only warms on the first chat request
+        while mode != "lazy" and time.perf_counter() < deadline and "warm_ms" not in result:
+            metrics_text = _get(f"{base_url}/metrics") or ""
+            if 'stage_duration_seconds_count{stage="startup_warmup"' in metrics_text:
+                result["warm_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            else:
+                time.sleep(0.02)
+        if "health_ms" not in result:
+            result["error"] = "timed out"
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--modules", default="main,core.chat_engine,voice_agent")
+    parser.add_argument("--modes", default="background,eager,lazy", help="STARTUP_WARMUP modes to time")
+    parser.add_argument("--top", type=int, default=10, help="Heaviest imports to report")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    modules = [m.strip() for m in args.modules.split(",") if m.strip()]
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+
+    results = {
+        "benchmark": "cold_start",
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": sys.version.split()[0],
+        "imports": [measure_import(module, args.runs, args.top) for module in modules],
+        "startup": [
+            {
+                "mode": mode,
+                "runs": [measure_startup(mode, args.port, args.timeout) for _ in range(args.runs)],
+            }
+            for mode in modes
+        ],
+    }
+    for entry in results["startup"]:
+        for key in ("health_ms", "warm_ms"):
+            samples = [run[key] for run in entry["runs"] if key in run]
+            if samples:
+                entry[f"median_{key}"] = statistics.median(samples)
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
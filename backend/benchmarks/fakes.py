@@ -0,0 +1,276 @@
+"""
+Local stand-ins for the services the chat path talks to, used by
+benchmarks/chat_load.py:
+
+- StubHandler: one HTTP server playing an OpenAI-compatible LLM
+  (/v1/chat/completions), SearXNG (/search), n8n webhooks (/webhook/...)
+  and plain web pages (/page/...).
+- InMemorySupabase: the subset of the supabase-py query builder used by
+  config_loader and agent_catalog, over an in-memory agent_configs table.
+
+The fake LLM is scripted by a marker in the user message:
+
+    "[[tools:web_search,web_scraper|n8n_webhook]] question"
+
+Each "|"-separated group is one LLM turn that calls those tools in parallel;
+once all groups have run, the model answers. Without a marker it answers
+right away.
+"""
+
+import json
+import re
+import threading
+import time
+import uuid
+import zlib
+from http.server import BaseHTTPRequestHandler
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+TOOL_MARKER_RE = re.compile(r"\[\[tools:([^\]]*)\]\]")
+ROUTER_SLUG_RE = re.compile(r"\(slug: ([\w-]+)\)")
+
+
+BENCH_AGENTS: List[Dict[str, Any]] = [
+    {
+        "id": "00000000-0000-0000-0000-000000000001",
+        "name": "General Assistant",
+        "slug": "general",
+        "description": "General questions, small talk and anything not covered by another agent.",
+        "system_prompt": "You are a helpful AI assistant.",
+        "model_name": "gpt-4o-mini",
+        "temperature": 0.7,
+        "tools": ["web_search", "web_scraper", "n8n_webhook"],
+        "custom_tools": [],
+        "is_active": True,
+    },
+    {
+        "id": "00000000-0000-0000-0000-000000000002",
+        "name": "Researcher",
+        "slug": "researcher",
+        "description": "Deep web research: searches the web, reads articles and summarizes sources.",
+        "system_prompt": "You research topics on the web and cite your sources.",
+        "model_name": "gpt-4o-mini",
+        "temperature": 0.2,
+        "tools": ["web_search", "web_scraper", "web_scraper_batch"],
+        "custom_tools": [],
+        "is_active": True,
+    },
+    {
+        "id": "00000000-0000-0000-0000-000000000003",
+        "name": "Automation",
+        "slug": "automation",
+        "description": "Triggers n8n automation workflows: send emails, create tickets, update spreadsheets.",
+        "system_prompt": "You run automations through n8n workflows.",
+        "model_name": "gpt-4o-mini",
+        "temperature": 0.0,
+        "tools": ["n8n_webhook"],
+        "custom_tools": [],
+        "is_active": True,
+    },
+]
+
+
+# ---------------------------------------------------------------------------
+# In-memory agent_configs
+
+
+class _Result:
+    def __init__(self, data):
+        self.data = data
+
+
+class _Query:
+    def __init__(self, rows: List[Dict[str, Any]]):
+        self._rows = rows
+        self._columns: Optional[List[str]] = None
+        self._single = False
+
+    def select(self, columns: str = "*") -> "_Query":
+        if columns.strip() != "*":
+            self._columns = [c.strip() for c in columns.split(",")]
+        return self
+
+    def eq(self, column: str, value: Any) -> "_Query":
+        self._rows = [r for r in self._rows if r.get(column) == value]
+        return self
+
+    def in_(self, column: str, values: List[Any]) -> "_Query":
+        values = set(values)
+        self._rows = [r for r in self._rows if r.get(column) in values]
+        return self
+
+    def single(self) -> "_Query":
+        self._single = True
+        return self
+
+    def execute(self) -> _Result:
+        rows = [dict(r) for r in self._rows]
+        if self._columns is not None:
+            rows = [{c: r.get(c) for c in self._columns} for r in rows]
+        if self._single:
+            if len(rows) != 1:
+                raise LookupError(f"Expected one row, got {len(rows)}")
+            return _Result(rows[0])
+        return _Result(rows)
+
+
+class InMemorySupabase:
+    def __init__(self, agents: List[Dict[str, Any]]):
+        self.tables = {"agent_configs": [dict(a) for a in agents]}
+
+    def table(self, name: str) -> _Query:
+        return _Query(self.tables.get(name, []))
+
+    def rpc(self, name: str, params: Dict[str, Any]) -> _Query:
+        return _Query([])
+
+
+# ---------------------------------------------------------------------------
+# Stub HTTP services
+
+
+class StubSettings:
+    llm_latency = 0.2
+    search_latency = 0.05
+    webhook_latency = 0.05
+    page_latency = 0.05
+    page_kb = 30
+    calls: Dict[str, int] = {}
+    lock = threading.Lock()
+
+    @classmethod
+    def count(cls, name: str) -> None:
+        with cls.lock:
+            cls.calls[name] = cls.calls.get(name, 0) + 1
+
+
+def _tool_args(name: str, base_url: str, turn: int) -> Dict[str, Any]:
+    if name == "web_search":
+        return {"query": f"benchmark query {turn}"}
+    if name == "web_scraper":
+        return {"url": f"{base_url}/page/{turn}"}
+    if name == "web_scraper_batch":
+        return {"urls": [f"{base_url}/page/{turn}-{i}" for i in range(3)]}
+    if name == "n8n_webhook":
+        return {"webhook_path": "bench", "payload": {"turn": turn}}
+    return {}
+
+
+def scripted_reply(messages: List[Dict[str, Any]], base_url: str) -> Dict[str, Any]:
+    """Next assistant message for a chat completion request."""
+    last_user = max((i for i, m in enumerate(messages) if m.get("role") == "user"), default=-1)
+    user_text = str(messages[last_user].get("content") or "") if last_user >= 0 else ""
+
+    # Orchestrator routing prompt: pick the first listed slug named in the request
+    if "You are the Orchestrator" in user_text:
+        request = user_text.split("User Request:", 1)[-1]
+        slugs = ROUTER_SLUG_RE.findall(user_text)
+        slug = next((s for s in slugs if s in request.lower()), "general")
+        return {"role": "assistant", "content": slug}
+
+    marker = TOOL_MARKER_RE.search(user_text)
+    rounds = [g.split(",") for g in marker.group(1).split("|")] if marker else []
+    done = sum(1 for m in messages[last_user + 1:] if m.get("role") == "assistant" and m.get("tool_calls"))
+    if done < len(rounds):
+        return {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [
+                {
+                    "id": f"call_{uuid.uuid4().hex[:12]}",
+                    "type": "function",
+                    "function": {"name": name.strip(), "arguments": json.dumps(_tool_args(name.strip(), base_url, done))},
+                }
+                for name in rounds[done]
+            ],
+        }
+    return {"role": "assistant", "content": f"Benchmark answer after {done} tool rounds. " + "lorem ipsum " * 20}
+
+
+def _page_html(kb: int) -> bytes:
+    paragraph = "<p>" + "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 8 + "</p>\n"
+    body = paragraph * max(1, kb * 1024 // len(paragraph))
+    return f"<html><head><title>Bench page</title></head><body>{body}</body></html>".encode("utf-8")
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def _send(self, status: int, body: bytes, content_type: str = "application/json") -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        if parts.path == "/search":
+            StubSettings.count("search")
+            time.sleep(StubSettings.search_latency)
+            query = parse_qs(parts.query).get("q", [""])[0]
+            results = [
+                {
+                    "title": f"Result {i} for {query}",
+                    "url": f"{self._base_url()}/page/{zlib.crc32((query + str(i)).encode()) % 1000}",
+                    "content": f"Snippet {i} about {query}.",
+                    "engines": ["bench"],
+                    "category": "general",
+                }
+                for i in range(10)
+            ]
+            self._send(200, json.dumps({"query": query, "results": results}).encode("utf-8"))
+        elif parts.path.startswith("/page/"):
+            StubSettings.count("page")
+            time.sleep(StubSettings.page_latency)
+            self._send(200, _page_html(StubSettings.page_kb), "text/html; charset=utf-8")
+        else:
+            self._send(404, b'{"error": "not found"}')
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        raw = self.rfile.read(length)
+        path = urlsplit(self.path).path
+        if path.endswith("/chat/completions"):
+            StubSettings.count("llm")
+            request = json.loads(raw or b"{}")
+            if request.get("stream"):
+                self._send(400, b'{"error": {"message": "streaming is not supported by the stub"}}')
+                return
+            time.sleep(StubSettings.llm_latency)
+            message = scripted_reply(request.get("messages", []), self._base_url())
+            prompt_tokens = len(raw) // 4
+            completion_tokens = len(json.dumps(message)) // 4
+            body = {
+                "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "gpt-4o-mini"),
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": message,
+                        "finish_reason": "tool_calls" if message.get("tool_calls") else "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            }
+            self._send(200, json.dumps(body).encode("utf-8"))
+        elif path.startswith("/webhook/"):
+            StubSettings.count("webhook")
+            time.sleep(StubSettings.webhook_latency)
+            self._send(200, b'{"ok": true, "result": "workflow finished"}')
+        else:
+            self._send(404, b'{"error": "not found"}')
+
+    def log_message(self, *args):
+        pass
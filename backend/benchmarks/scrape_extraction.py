@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Scraper extraction benchmark: BeautifulSoup (full parse, then truncate)
+vs the streaming, size-capped extractor, over a corpus of saved HTML pages.
+
+    python benchmarks/scrape_extraction.py --corpus ~/saved-pages --output scrape.json
+
+Without --corpus a synthetic corpus (50 KB / 500 KB / 5 MB pages) is used.
+Reports parse time and tracemalloc peak memory per page and mode.
+"""
+
+import argparse
+import glob
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.html_extract import StreamingTextExtractor
+from tools.scraper import CHUNK_SIZE, MAX_CHARS, extract_text
+
+
+def synthetic_corpus():
+    paragraph = "<p>" + "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 8 + "</p>\n"
+    script = "<script>" + "var x = {a: 1, b: [1, 2, 3]};" * 200 + "</script>\n"
+    pages = {}
+    for size_kb in (50, 500, 5000):
+        body = []
+        total = 0
+        while total < size_kb * 1024:
+            block = script if len(body) % 5 == 0 else paragraph
+            body.append(block)
+            total += len(block)
+        pages[f"synthetic-{size_kb}kb.html"] = "<html><head><title>t</title></head><body>" + "".join(body) + "</body></html>"
+    return pages
+
+
+def load_corpus(path):
+    pages = {}
+    for file in sorted(glob.glob(os.path.join(path, "**", "*.htm*"), recursive=True)):
+        with open(file, "rb") as f:
+            pages[os.path.relpath(file, path)] = f.read().decode("utf-8", errors="replace")
+    return pages
+
+
+def run_soup(html):
+    text = extract_text(html)
+    return text[:MAX_CHARS]
+
+
+def run_stream(html):
+    raw = html.encode("utf-8")
+    extractor = StreamingTextExtractor(MAX_CHARS)
+    for start in range(0, len(raw), CHUNK_SIZE):
+        if extractor.feed(raw[start:start + CHUNK_SIZE].decode("utf-8", errors="ignore")):
+            break
+    extractor.close()
+    return extractor.text[:MAX_CHARS]
+
+
+def measure(fn, html, repeat):
+    times = []
+    peak = 0
+    for _ in range(repeat):
+        tracemalloc.start()
+        start = time.perf_counter()
+        fn(html)
+        times.append(time.perf_counter() - start)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return statistics.median(times), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--corpus", help="Directory of saved .html pages")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus) if args.corpus else synthetic_corpus()
+    results = []
+    for name, html in pages.items():
+        for mode, fn in (("soup", run_soup), ("stream", run_stream)):
+            seconds, peak = measure(fn, html, args.repeat)
+            row = {
+                "page": name,
+                "bytes": len(html.encode("utf-8")),
+                "mode": mode,
+                "parse_ms": round(seconds * 1000, 2),
+                "peak_kb": round(peak / 1024, 1),
+            }
+            results.append(row)
+            print(json.dumps(row))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+import os
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from core import metrics
+
+# Admission control in front of the chat handlers.
+#
+# Every chat request takes one slot for its agent and one for its model.
+# When all slots are busy it waits in a bounded priority queue: voice
+# requests go first, then interactive chat, then batch traffic. A full
+# queue is rejected at once (429) and a request that waits past its lane's
+# deadline is rejected too (503); both carry Retry-After.
+
+ADMISSION_AGENT_CONCURRENCY = int(os.getenv("ADMISSION_AGENT_CONCURRENCY", "32"))
+ADMISSION_MODEL_CONCURRENCY = int(os.getenv("ADMISSION_MODEL_CONCURRENCY", "64"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "100"))
+
+LANES = ("voice", "interactive", "batch")
+DEFAULT_LANE = "interactive"
+# Longest time a request of each lane may wait for a slot
+LANE_QUEUE_TIMEOUTS = {
+    "voice": float(os.getenv("ADMISSION_VOICE_QUEUE_TIMEOUT", "2")),
+    "interactive": float(os.getenv("ADMISSION_INTERACTIVE_QUEUE_TIMEOUT", "10")),
+    "batch": float(os.getenv("ADMISSION_BATCH_QUEUE_TIMEOUT", "30")),
+}
+
+admission_requests = metrics.counter(
+    "admission_requests_total", "Chat admission outcomes", ("lane", "result")
+)
+
+
+class AdmissionRejected(Exception):
+    """No slot available; map to an HTTP error with a Retry-After header."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+def lane_priority(lane: str) -> int:
+    return LANES.index(lane) if lane in LANES else LANES.index(DEFAULT_LANE)
+
+
+class PrioritySemaphore:
+    """
+    Semaphore whose waiters are served by priority (lower first), then FIFO.
+    The wait queue is bounded, and each waiter has a deadline.
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int = ADMISSION_MAX_QUEUE):
+        self.name = name
+        self.limit = max(1, limit)
+        self.max_queue = max_queue
+        self.active = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        # Moving average of how long a slot is held, for Retry-After
+        self._avg_hold = 1.0
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    def retry_after(self) -> int:
+        """Rough seconds until a slot frees up for a new arrival."""
+        rounds = (self.queued + 1) / self.limit
+        return max(1, math.ceil(rounds * self._avg_hold))
+
+    async def acquire(self, priority: int, timeout: float) -> None:
+        if self.active < self.limit and not self.queued:
+            self.active += 1
+            return
+        if self.queued >= self.max_queue:
+            raise AdmissionRejected(429, f"Too many requests queued for {self.name}", self.retry_after())
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                # Granted just as the deadline hit: hand the slot on
+                self.release()
+            future.cancel()
+            raise AdmissionRejected(503, f"Timed out waiting for capacity on {self.name}", self.retry_after())
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()
+            future.cancel()
+            raise
+
+    def release(self, held_seconds: Optional[float] = None) -> None:
+        if held_seconds is not None:
+            self._avg_hold = 0.9 * self._avg_hold + 0.1 * held_seconds
+        # Pass the slot straight to the best waiter still waiting
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.active = max(0, self.active - 1)
+
+
+class AdmissionTicket:
+    """Held slots for one request. release() is idempotent."""
+
+    def __init__(self, semaphores: List[PrioritySemaphore]):
+        self._semaphores = semaphores
+        self._acquired_at = time.monotonic()
+        self._released = False
+
+    def release(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        held = time.monotonic() - self._acquired_at
+        for semaphore in reversed(self._semaphores):
+            semaphore.release(held)
+
+
+class AdmissionController:
+    def __init__(self):
+        self._agents: Dict[str, PrioritySemaphore] = {}
+        self._models: Dict[str, PrioritySemaphore] = {}
+
+    def _agent_semaphore(self, slug: str, agent_config: Dict[str, Any]) -> PrioritySemaphore:
+        limit = agent_config.get("max_concurrent_requests") or ADMISSION_AGENT_CONCURRENCY
+        semaphore = self._agents.get(slug)
+        if semaphore is None:
+            semaphore = PrioritySemaphore(f"agent '{slug}'", int(limit))
+            self._agents[slug] = semaphore
+        else:
+            # Picks up edits to max_concurrent_requests without a restart
+            semaphore.limit = max(1, int(limit))
+        return semaphore
+
+    def _model_semaphore(self, model: str) -> PrioritySemaphore:
+        semaphore = self._models.get(model)
+        if semaphore is None:
+            semaphore = PrioritySemaphore(f"model '{model}'", ADMISSION_MODEL_CONCURRENCY)
+            self._models[model] = semaphore
+        return semaphore
+
+    async def acquire(self, slug: str, model: str, agent_config: Dict[str, Any], lane: str = DEFAULT_LANE) -> AdmissionTicket:
+        """
+        Take the agent slot, then the model slot. Raises AdmissionRejected
+        when either queue is full or the lane's wait deadline passes.
+        """
+        lane = lane if lane in LANES else DEFAULT_LANE
+        priority = lane_priority(lane)
+        deadline = time.monotonic() + LANE_QUEUE_TIMEOUTS[lane]
+
+        held: List[PrioritySemaphore] = []
+        try:
+            for semaphore in (self._agent_semaphore(slug, agent_config), self._model_semaphore(model)):
+                queued = semaphore.active >= semaphore.limit
+                await semaphore.acquire(priority, max(0.0, deadline - time.monotonic()))
+                held.append(semaphore)
+                if queued:
+                    admission_requests.inc(lane=lane, result="queued")
+        except AdmissionRejected as e:
+            for semaphore in reversed(held):
+                semaphore.release()
+            admission_requests.inc(lane=lane, result="rejected_full" if e.status_code == 429 else "rejected_timeout")
+            raise
+        except BaseException:
+            for semaphore in reversed(held):
+                semaphore.release()
+            raise
+
+        admission_requests.inc(lane=lane, result="admitted")
+        return AdmissionTicket(held)
+
+    @asynccontextmanager
+    async def admit(self, slug: str, model: str, agent_config: Dict[str, Any], lane: str = DEFAULT_LANE) -> AsyncIterator[None]:
+        ticket = await self.acquire(slug, model, agent_config, lane)
+        try:
+            yield
+        finally:
+            ticket.release()
+
+
+admission = AdmissionController()
@@ -0,0 +1,138 @@
+import os
+import asyncio
+import time
+from typing import Dict, FrozenSet, List, Optional, Set
+from core import config_events
+
+CATALOG_COLUMNS = "name, slug, description, system_prompt"
+
+# Safety net in case a change notification is missed
+CATALOG_FULL_REFRESH_SECONDS = float(os.getenv("AGENT_CATALOG_FULL_REFRESH_SECONDS", "900"))
+
+
+def render_agent_line(agent: Dict) -> str:
+    desc = agent.get("description")
+    # Fallback to system prompt snippet if description is empty
+    if not desc:
+        desc = (agent.get("system_prompt") or "")[:150].replace("\n", " ") + "..."
+    return f"- {agent['name']} (slug: {agent['slug']}): {desc}\n"
+
+
+class CatalogSnapshot:
+    """
+    Immutable view of the catalog used for one routing decision.
+    """
+
+    def __init__(self, version: int, agents: Dict[str, Dict], prompt_fragment: str):
+        self.version = version
+        self.agents = agents
+        self.slugs: FrozenSet[str] = frozenset(agents)
+        self.prompt_fragment = prompt_fragment
+
+
+class AgentCatalog:
+    """
+    In-memory, versioned catalog of routable agents.
+
+    The first use loads every agent once. Later changes from config_events
+    only mark the changed slugs dirty. The next snapshot() re-fetches just those
+    rows, so routing needs no DB round trips in the steady state. The
+    rendered line of each agent is kept, and the prompt fragment is rebuilt
+    only when something actually changed. Each real change bumps version.
+    """
+
+    def __init__(self, supabase):
+        self.supabase = supabase
+        self.version = 0
+        self._agents: Dict[str, Dict] = {}
+        self._lines: Dict[str, str] = {}
+        self._snapshot = CatalogSnapshot(0, {}, "")
+        self._loaded_at: Optional[float] = None
+        self._dirty: Set[str] = set()
+        self._needs_full_reload = True
+        # Created lazily: on Python 3.9 a Lock binds to the loop current at construction
+        self._lock: Optional[asyncio.Lock] = None
+        config_events.subscribe(self._on_config_change)
+
+    def _on_config_change(self, event_type: str, slug: Optional[str]):
+        if slug is None:
+            self._needs_full_reload = True
+        else:
+            self._dirty.add(slug)
+
+    def _fetch_all(self) -> List[Dict]:
+        response = self.supabase.table("agent_configs").select(CATALOG_COLUMNS).execute()
+        return response.data or []
+
+    def _fetch_slugs(self, slugs: List[str]) -> List[Dict]:
+        response = self.supabase.table("agent_configs").select(CATALOG_COLUMNS).in_("slug", slugs).execute()
+        return response.data or []
+
+    def _is_current(self) -> bool:
+        if self._needs_full_reload or self._dirty or self._loaded_at is None:
+            return False
+        return time.monotonic() - self._loaded_at < CATALOG_FULL_REFRESH_SECONDS
+
+    async def snapshot(self) -> CatalogSnapshot:
+        if self._is_current():
+            return self._snapshot
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            if self._is_current():
+                return self._snapshot
+
+            full_reload = (
+                self._needs_full_reload
+                or self._loaded_at is None
+                or time.monotonic() - self._loaded_at >= CATALOG_FULL_REFRESH_SECONDS
+            )
+            dirty = sorted(self._dirty)
+            self._dirty.clear()
+            try:
+                if full_reload:
+                    self._needs_full_reload = False
+                    rows = await asyncio.to_thread(self._fetch_all)
+                    changed = self._replace_all(rows)
+                    self._loaded_at = time.monotonic()
+                else:
+                    rows = await asyncio.to_thread(self._fetch_slugs, dirty)
+                    changed = self._apply_rows(dirty, rows)
+            except Exception:
+                # Retry the same work on the next snapshot()
+                self._needs_full_reload = self._needs_full_reload or full_reload
+                self._dirty.update(dirty)
+                raise
+
+            if changed:
+                self.version += 1
+                self._snapshot = CatalogSnapshot(
+                    self.version, dict(self._agents), "".join(self._lines.values())
+                )
+            return self._snapshot
+
+    def _replace_all(self, rows: List[Dict]) -> bool:
+        agents = {row["slug"]: row for row in rows}
+        if agents == self._agents:
+            return False
+        self._agents = agents
+        self._lines = {slug: render_agent_line(agent) for slug, agent in agents.items()}
+        return True
+
+    def _apply_rows(self, slugs: List[str], rows: List[Dict]) -> bool:
+        found = {row["slug"]: row for row in rows}
+        changed = False
+        for slug in slugs:
+            row = found.get(slug)
+            if row is None:
+                if slug in self._agents:
+                    del self._agents[slug]
+                    del self._lines[slug]
+                    changed = True
+            elif self._agents.get(slug) != row:
+                self._agents[slug] = row
+                self._lines[slug] = render_agent_line(row)
+                changed = True
+        return changed
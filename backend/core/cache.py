@@ -0,0 +1,137 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "stale_until")
+
+    def __init__(self, value: Any, expires_at: float, stale_until: float):
+        self.value = value
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+
+
+class TTLCache:
+    """
+    Bounded in-process cache for async loaders.
+
+    - Per-key TTL (LRU eviction once maxsize is reached).
+    - Negative caching: values matching is_negative (None by default) are
+      kept for negative_ttl only, and never served stale.
+    - Stale-while-revalidate: for stale_ttl seconds after expiry the old
+      value is returned immediately while a background refresh runs. A
+      refresh that comes back negative doesn't replace the stale value.
+    - Single-flight: concurrent misses for the same key share one load.
+    - Invalidation bumps a per-key generation so a load that was already
+      in flight can't write back a value fetched before the change.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 300.0,
+        negative_ttl: float = 15.0,
+        stale_ttl: float = 0.0,
+        is_negative: Optional[Callable[[Any], bool]] = None,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stale_ttl = stale_ttl
+        self.is_negative = is_negative or (lambda value: value is None)
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._generations: Dict[Hashable, int] = {}
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _lookup(self, key: Hashable, now: float) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if now >= entry.stale_until:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return a fresh (or still-servable stale) value without loading."""
+        entry = self._lookup(key, time.monotonic())
+        if entry is None:
+            return default
+        return entry.value
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self._lookup(key, time.monotonic()) is not None
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        now = time.monotonic()
+        if self.is_negative(value):
+            expires_at = now + self.negative_ttl
+            stale_until = expires_at
+        else:
+            expires_at = now + (self.ttl if ttl is None else ttl)
+            stale_until = expires_at + self.stale_ttl
+        self._entries[key] = _Entry(value, expires_at, stale_until)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+        self._generations[key] = self._generations.get(key, 0) + 1
+
+    def clear(self) -> None:
+        self._epoch += 1
+        self._generations.clear()
+        self._entries.clear()
+
+    def _generation(self, key: Hashable):
+        return self._epoch, self._generations.get(key, 0)
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        now = time.monotonic()
+        entry = self._lookup(key, now)
+        if entry is not None:
+            self.hits += 1
+            if now >= entry.expires_at:
+                # Stale: serve it and refresh in the background
+                self._load(key, loader, refresh=True)
+            return entry.value
+
+        self.misses += 1
+        return await asyncio.shield(self._load(key, loader))
+
+    def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]], refresh: bool = False) -> asyncio.Future:
+        future = self._inflight.get(key)
+        if future is not None:
+            return future
+
+        generation = self._generation(key)
+
+        async def run():
+            try:
+                value = await loader()
+                if self._generation(key) != generation:
+                    return value
+                # A failed background refresh keeps serving the stale value;
+                # real deletions arrive through invalidate().
+                if refresh and self.is_negative(value) and key in self._entries:
+                    return value
+                self.set(key, value)
+                return value
+            finally:
+                self._inflight.pop(key, None)
+
+        future = asyncio.ensure_future(run())
+        # Background refreshes nobody awaits must not log "exception never retrieved"
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        return future
@@ -0,0 +1,474 @@
+import os
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    HumanMessage,
+    SystemMessage,
+    ToolMessage,
+    message_chunk_to_message,
+)
+from core import llm_registry, metrics, response_cache, telemetry
+from core.context_budget import (
+    ContextBudget,
+    count_history,
+    count_tokens,
+    fit_history,
+    shrink_tool_messages,
+    truncate_tool_result,
+)
+from core.config_loader import get_agent_config_async
+from core.tool_factory import get_compiled_toolset
+from core.logger import get_logger
+from tools.n8n_jobs import collect_finished_jobs, current_conversation_id
+
+log = get_logger(__name__)
+
+
+# Defaults for agents that don't set max_tool_concurrency / tool_timeout_seconds
+DEFAULT_MAX_TOOL_CONCURRENCY = int(os.getenv("DEFAULT_MAX_TOOL_CONCURRENCY", "4"))
+DEFAULT_TOOL_TIMEOUT_SECONDS = float(os.getenv("DEFAULT_TOOL_TIMEOUT_SECONDS", "30"))
+
+# Defaults for agents that don't set max_iterations / request_deadline_seconds /
+# max_request_tokens (0 = no token limit)
+DEFAULT_MAX_ITERATIONS = int(os.getenv("DEFAULT_MAX_ITERATIONS", "8"))
+DEFAULT_REQUEST_DEADLINE_SECONDS = float(os.getenv("DEFAULT_REQUEST_DEADLINE_SECONDS", "120"))
+DEFAULT_MAX_REQUEST_TOKENS = int(os.getenv("DEFAULT_MAX_REQUEST_TOKENS", "0"))
+
+# Slice of request_deadline_seconds kept back for the forced final answer
+# (at most a quarter of the deadline)
+FORCED_ANSWER_RESERVE_SECONDS = float(os.getenv("FORCED_ANSWER_RESERVE_SECONDS", "10"))
+# Sent when even the forced final answer misses the deadline
+DEADLINE_ANSWER = "Sorry, I ran out of time before I could finish answering this request."
+
+FORCED_ANSWER_PROMPT = (
+    "You have run out of {reason} for this request. Do not call any more tools. "
+    "Answer the user now with the information gathered so far, and say briefly "
+    "if anything could not be completed."
+)
+
+budget_exhaustions = metrics.counter(
+    "react_budget_exhausted_total", "ReAct runs stopped by a per-request budget", ("agent", "budget")
+)
+
+
+class AgentNotFoundError(Exception):
+    """Raised when the requested (or routed) agent slug has no configuration."""
+
+
+class RunBudget:
+    """
+    Hard per-request limits for the ReAct loop: LLM calls, wall-clock time
+    and tokens (prompt + completion, summed over all calls).
+    """
+
+    def __init__(self, agent_config: Dict[str, Any]):
+        def setting(column: str, default):
+            value = agent_config.get(column)
+            return default if value is None else value
+
+        self.max_iterations = max(1, int(setting("max_iterations", DEFAULT_MAX_ITERATIONS)))
+        self.deadline_seconds = float(setting("request_deadline_seconds", DEFAULT_REQUEST_DEADLINE_SECONDS))
+        self.max_tokens = int(setting("max_request_tokens", DEFAULT_MAX_REQUEST_TOKENS))
+        self.reserve_seconds = (
+            min(FORCED_ANSWER_RESERVE_SECONDS, self.deadline_seconds / 4) if self.deadline_seconds > 0 else 0.0
+        )
+        self.started = time.monotonic()
+        self.iterations = 0
+        self.tokens = 0
+
+    def remaining_seconds(self) -> float:
+        if self.deadline_seconds <= 0:
+            return float("inf")
+        return self.deadline_seconds - (time.monotonic() - self.started)
+
+    def work_seconds(self) -> float:
+        """Time left for LLM calls and tools, keeping the forced-answer reserve."""
+        return self.remaining_seconds() - self.reserve_seconds
+
+    def record(self, tokens: int) -> None:
+        self.iterations += 1
+        self.tokens += tokens
+
+    def exhausted(self) -> Optional[str]:
+        """Name of the first budget used up, or None."""
+        if self.iterations >= self.max_iterations:
+            return "iterations"
+        if self.work_seconds() <= 0:
+            return "time"
+        if self.max_tokens > 0 and self.tokens >= self.max_tokens:
+            return "tokens"
+        return None
+
+
+class ChatRun:
+    """
+    Everything needed to run one chat request through the ReAct loop:
+    the resolved agent, its tools, the tool-bound LLM and the message history.
+    """
+
+    def __init__(
+        self,
+        agent_slug: str,
+        agent_config: Dict[str, Any],
+        tools_by_name: Dict[str, Any],
+        model_name: str,
+        llm_with_tools: Any,
+        messages: List[BaseMessage],
+        conversation_id: Optional[str] = None,
+        budget: Optional[ContextBudget] = None,
+        llm: Any = None,
+    ):
+        self.agent_slug = agent_slug
+        self.agent_config = agent_config
+        self.tools_by_name = tools_by_name
+        self.model_name = model_name
+        self.llm_with_tools = llm_with_tools
+        # Same model without tools, for the forced final answer
+        self.llm = llm or llm_with_tools
+        self.messages = messages
+        self.conversation_id = conversation_id
+        self.budget = budget or ContextBudget(agent_config)
+        self.run_budget = RunBudget(agent_config)
+        # Set by prepare_chat_run for agents with the response cache enabled
+        self.cache_key: Optional[response_cache.CacheKey] = None
+        self.cached_response: Optional[str] = None
+        # Messages from here on belong to this turn (the new user message onwards)
+        self.turn_start = len(messages) - 1 if messages and isinstance(messages[-1], HumanMessage) else len(messages)
+
+    def new_messages(self) -> List[BaseMessage]:
+        """The user message plus everything the model and tools added this turn."""
+        return self.messages[self.turn_start:]
+
+
+async def resolve_agent_slug(agent_slug: Optional[str], last_user_message: str, orchestrator) -> str:
+    """
+    Resolve 'auto' (or an empty slug) to a concrete agent via the Orchestrator.
+    """
+    if agent_slug and agent_slug != "auto":
+        return agent_slug
+
+    if not last_user_message:
+        log.debug("No user message found, defaulting to general")
+        return "general"
+
+    with telemetry.span("routing", "auto"):
+        selected_slug = await orchestrator.route_request(last_user_message)
+    log.info("Auto-Pilot routed request to %s", selected_slug)
+    return selected_slug
+
+
+def history_from_dicts(history: List[Dict[str, str]]) -> List[BaseMessage]:
+    """Convert client-sent {role, content} messages to LangChain messages."""
+    messages: List[BaseMessage] = []
+    for msg in history:
+        if msg["role"] == "user":
+            messages.append(HumanMessage(content=msg["content"]))
+        elif msg["role"] == "assistant":
+            messages.append(AIMessage(content=msg["content"]))
+    return messages
+
+
+async def prepare_chat_run(
+    agent_slug: str,
+    history: List[BaseMessage],
+    model: Optional[str] = None,
+    conversation_id: Optional[str] = None,
+    agent_config: Optional[Dict[str, Any]] = None,
+) -> ChatRun:
+    """
+    Load the agent configuration, build its tools and LLM, and put the
+    system prompt in front of the history. Background n8n jobs of this
+    conversation that finished since the last turn are added as context.
+    Pass agent_config if the caller already loaded it.
+    """
+    if agent_config is None:
+        with telemetry.span("config_fetch", agent_slug):
+            agent_config = await get_agent_config_async(agent_slug)
+
+    if not agent_config:
+        raise AgentNotFoundError(f"Agent '{agent_slug}' not found")
+
+    # 1. Setup Tools (built once per agent config version)
+    with telemetry.span("toolset_build", agent_slug):
+        toolset = get_compiled_toolset(agent_slug, agent_config)
+
+    # 2. Setup LLM (shared client; the agent's Vault key wins over the env key)
+    model_name = model or agent_config.get("model_name", "gpt-3.5-turbo")
+    temperature = agent_config.get("temperature", 0.7)
+
+    llm = llm_registry.get_chat_model(
+        model_name,
+        temperature if temperature is not None else 0.7,
+        api_key=agent_config.get("model_api_key"),
+    )
+
+    # Bind the pre-serialized tool schemas if available
+    if toolset.schemas:
+        llm_with_tools = llm.bind(tools=toolset.schemas)
+    else:
+        llm_with_tools = llm
+
+    # 3. Prepare Messages
+    system_prompt = agent_config.get("system_prompt", "You are a helpful AI assistant.")
+    messages: List[BaseMessage] = [SystemMessage(content=system_prompt)] + list(history)
+
+    finished_jobs = await collect_finished_jobs(conversation_id)
+    if finished_jobs:
+        # Just before the latest user message, so the model answers with them in view
+        notice = SystemMessage(content="Background workflow updates:\n" + "\n".join(j.summary() for j in finished_jobs))
+        insert_at = len(messages) - 1 if isinstance(messages[-1], HumanMessage) else len(messages)
+        messages.insert(insert_at, notice)
+
+    # 4. Deterministic agents may have answered this question already
+    # (not when background job results were just added to the prompt)
+    cache_key = None
+    cached = None
+    if not finished_jobs:
+        cache_key = response_cache.build_key(agent_slug, agent_config, model_name, messages)
+        cached = response_cache.response_cache.lookup(cache_key) if cache_key else None
+
+    # 5. Keep long conversations inside the agent's context budget
+    budget = ContextBudget(agent_config)
+    if cached is None:
+        messages = await fit_history(messages, model_name, budget)
+
+    run = ChatRun(
+        agent_slug, agent_config, toolset.tools_by_name, model_name, llm_with_tools, messages,
+        conversation_id, budget, llm,
+    )
+    run.cache_key = cache_key
+    if cached is not None:
+        run.cached_response, match = cached
+        log.debug("Response cache %s hit for %s", match, agent_slug)
+    return run
+
+
+async def _call_llm(
+    run: ChatRun,
+    stream: bool,
+    llm: Any = None,
+    messages: Optional[List[BaseMessage]] = None,
+    timeout: float = float("inf"),
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Call the LLM once (the tool-bound model with the run's messages unless
+    given others). In streaming mode every content delta is yielded as a
+    'token' event while the chunks are accumulated; the final 'message' event
+    always carries the complete AIMessage (including any tool calls).
+
+    Raises asyncio.TimeoutError when the call (including waiting for a model
+    slot and every stream read) takes longer than `timeout` seconds in total.
+    """
+    llm = llm or run.llm_with_tools
+    messages = messages if messages is not None else run.messages
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+
+    def left() -> Optional[float]:
+        return None if timeout == float("inf") else max(0.0, deadline - loop.time())
+
+    if not stream:
+        async def invoke():
+            async with llm_registry.model_slot(run.model_name):
+                return await llm.ainvoke(messages)
+
+        with telemetry.span("llm_call", run.model_name):
+            response = await asyncio.wait_for(invoke(), left())
+        yield {"type": "message", "message": response}
+        return
+
+    gathered = None
+    with telemetry.span("llm_call", run.model_name):
+        async with llm_registry.model_slot(run.model_name):
+            chunks = llm.astream(messages)
+            try:
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), left())
+                    except StopAsyncIteration:
+                        break
+                    if chunk.content:
+                        yield {"type": "token", "content": chunk.content}
+                    gathered = chunk if gathered is None else gathered + chunk
+            finally:
+                # Closing the generator closes the upstream HTTP stream, so a client
+                # that disconnects mid-answer stops consuming tokens immediately.
+                await chunks.aclose()
+
+    response = message_chunk_to_message(gathered) if gathered is not None else AIMessage(content="")
+    yield {"type": "message", "message": response}
+
+
+async def _invoke_tool(run: ChatRun, tool_call: Dict[str, Any], semaphore: asyncio.Semaphore, timeout: float) -> str:
+    # Find the matching tool function
+    selected_tool = run.tools_by_name.get(tool_call["name"])
+
+    if not selected_tool:
+        # Handle missing tool
+        return f"Error: Tool {tool_call['name']} not found."
+
+    async with semaphore:
+        log.debug("Executing tool %s with args %s", tool_call["name"], tool_call["args"])
+        try:
+            with telemetry.span("tool_call", tool_call["name"]):
+                tool_result = await asyncio.wait_for(selected_tool.ainvoke(tool_call["args"]), timeout)
+        except asyncio.TimeoutError:
+            return f"Error: Tool {tool_call['name']} timed out after {timeout:g} seconds."
+        except Exception as e:
+            return f"Error: Tool {tool_call['name']} failed: {str(e)}"
+    return str(tool_result)
+
+
+async def _execute_tool_calls(run: ChatRun, tool_calls: List[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run all tool calls of one LLM turn concurrently (bounded by the agent's
+    max_tool_concurrency, each capped by tool_timeout_seconds).
+
+    'tool_end' events are yielded as tools finish, but the ToolMessages are
+    appended in the order the model requested them so the history stays
+    deterministic.
+    """
+    max_concurrency = run.agent_config.get("max_tool_concurrency") or DEFAULT_MAX_TOOL_CONCURRENCY
+    timeout = run.agent_config.get("tool_timeout_seconds") or DEFAULT_TOOL_TIMEOUT_SECONDS
+    # Tools can't outlive the request deadline (minus the forced-answer reserve)
+    timeout = min(float(timeout), max(1.0, run.run_budget.work_seconds()))
+    semaphore = asyncio.Semaphore(max(1, int(max_concurrency)))
+
+    for tool_call in tool_calls:
+        yield {"type": "tool_start", "id": tool_call["id"], "name": tool_call["name"], "args": tool_call["args"]}
+
+    async def indexed(index: int, tool_call: Dict[str, Any]):
+        return index, await _invoke_tool(run, tool_call, semaphore, float(timeout))
+
+    tasks = [asyncio.ensure_future(indexed(i, tc)) for i, tc in enumerate(tool_calls)]
+    results: List[Optional[str]] = [None] * len(tool_calls)
+    try:
+        for finished in asyncio.as_completed(tasks):
+            index, content = await finished
+            results[index] = content
+            tool_call = tool_calls[index]
+            yield {"type": "tool_end", "id": tool_call["id"], "name": tool_call["name"], "content": content}
+    finally:
+        # Client went away or the loop was cancelled: don't leave tools running
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+    # Append results to messages in request order
+    for tool_call, content in zip(tool_calls, results):
+        run.messages.append(ToolMessage(
+            tool_call_id=tool_call["id"],
+            name=tool_call["name"],
+            content=truncate_tool_result(content, run.budget)
+        ))
+    shrink_tool_messages(run.messages, run.model_name, run.budget)
+
+
+def _used_tokens(run: ChatRun, prompt: List[BaseMessage], response: AIMessage) -> int:
+    usage = getattr(response, "usage_metadata", None)
+    if usage and usage.get("total_tokens"):
+        return usage["total_tokens"]
+    # Provider didn't report usage; estimate locally
+    return count_history(run.model_name, prompt) + count_tokens(run.model_name, response)
+
+
+async def run_react_loop(run: ChatRun, stream: bool = False) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run the ReAct loop (LLM -> tools -> LLM ...) and yield progress events:
+
+    - {"type": "token", "content": str}                  (stream=True only)
+    - {"type": "tool_start", "id", "name", "args"}
+    - {"type": "tool_end", "id", "name", "content"}
+    - {"type": "budget_exhausted", "budget": str}        (iterations | time | tokens)
+    - {"type": "discard"}                                (stream=True only)
+    - {"type": "done", "response": str, "cached": bool}
+
+    'discard' voids the tokens sent since the previous non-token event: an
+    answer cut off by the deadline is replaced by the one that follows.
+
+    The budgets are checked before every LLM call, and each call is cut off
+    at the request deadline. When a budget runs out, the model is called once
+    more without tools (within the time kept in reserve for it) and told to
+    answer with what it has.
+    """
+    if run.cached_response is not None:
+        run.messages.append(AIMessage(content=run.cached_response))
+        if stream:
+            yield {"type": "token", "content": run.cached_response}
+        yield {"type": "done", "response": run.cached_response, "cached": True}
+        return
+
+    # Lets tools that start background work (n8n jobs) tie it to this conversation
+    current_conversation_id.set(run.conversation_id)
+    budget = run.run_budget
+    exhausted = None
+    response = None
+    while True:
+        exhausted = budget.exhausted()
+        if exhausted:
+            break
+
+        response = None
+        streamed = False
+        try:
+            async for event in _call_llm(run, stream, timeout=budget.work_seconds()):
+                if event["type"] == "message":
+                    response = event["message"]
+                else:
+                    streamed = True
+                    yield event
+        except asyncio.TimeoutError:
+            # The partial answer is dropped; the forced answer replaces it
+            if streamed:
+                yield {"type": "discard"}
+            exhausted = "time"
+            break
+        budget.record(_used_tokens(run, run.messages, response))
+        run.messages.append(response)
+
+        # Loop while the LLM wants to call tools
+        if not response.tool_calls:
+            break
+
+        async for event in _execute_tool_calls(run, response.tool_calls):
+            yield event
+
+    if exhausted:
+        budget_exhaustions.inc(agent=run.agent_slug, budget=exhausted)
+        log.warning(
+            "ReAct budget '%s' exhausted for %s after %d LLM calls", exhausted, run.agent_slug, budget.iterations
+        )
+        yield {"type": "budget_exhausted", "budget": exhausted}
+
+        # The instruction is sent but not kept in the transcript
+        reason = {"iterations": "tool-call steps", "time": "time", "tokens": "token budget"}[exhausted]
+        forced_prompt = run.messages + [SystemMessage(content=FORCED_ANSWER_PROMPT.format(reason=reason))]
+        response = None
+        streamed = False
+        try:
+            async for event in _call_llm(
+                run, stream, llm=run.llm, messages=forced_prompt, timeout=max(0.0, budget.remaining_seconds())
+            ):
+                if event["type"] == "message":
+                    response = event["message"]
+                else:
+                    streamed = True
+                    yield event
+        except asyncio.TimeoutError:
+            response = AIMessage(content=DEADLINE_ANSWER)
+            if streamed:
+                yield {"type": "discard"}
+            if stream:
+                yield {"type": "token", "content": DEADLINE_ANSWER}
+        else:
+            budget.record(_used_tokens(run, forced_prompt, response))
+        run.messages.append(response)
+
+    # Answers cut short by a budget are not worth reusing
+    if run.cache_key is not None and not exhausted and response.content and response_cache.turn_is_cacheable(run.new_messages()):
+        response_cache.response_cache.store(run.cache_key, response.content)
+
+    yield {"type": "done", "response": response.content, "cached": False}
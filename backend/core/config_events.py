@@ -0,0 +1,80 @@
+import os
+import asyncio
+from typing import Callable, List, Optional
+from core.logger import get_logger
+
+log = get_logger(__name__)
+
+# Callback signature: (event_type, slug). slug is None when the change can't be
+# attributed to a single agent, and subscribers should then drop everything.
+ConfigChangeCallback = Callable[[str, Optional[str]], None]
+
+_subscribers: List[ConfigChangeCallback] = []
+_realtime_client = None
+
+
+def subscribe(callback: ConfigChangeCallback) -> None:
+    """
+    Register a callback for agent_configs changes.
+    """
+    _subscribers.append(callback)
+
+
+def publish(event_type: str, slug: Optional[str] = None) -> None:
+    """
+    Notify subscribers that an agent config was inserted, updated or deleted.
+
+    Called by the Supabase realtime listener, and usable directly as a local
+    stand-in (tests, scripts, admin endpoints) when realtime isn't available.
+    """
+    for callback in list(_subscribers):
+        try:
+            callback(event_type, slug)
+        except Exception as e:
+            log.error("Error in config change subscriber: %s", e)
+
+
+def _on_postgres_change(payload: dict) -> None:
+    data = payload.get("data", payload)
+    event_type = data.get("type") or data.get("eventType") or "UPDATE"
+    record = data.get("record") or {}
+    old_record = data.get("old_record") or {}
+    slug = record.get("slug") or old_record.get("slug")
+    publish(event_type, slug)
+    # A rename moves the config to a new slug; the old one must go too
+    if old_record.get("slug") and record.get("slug") and old_record["slug"] != record["slug"]:
+        publish(event_type, old_record["slug"])
+
+
+async def start_realtime_listener(timeout: float = 10.0) -> bool:
+    """
+    Subscribe to Supabase realtime changes on the agent_configs table and
+    forward them to publish(). Returns False (and leaves TTL expiry as the
+    only invalidation path) if realtime isn't reachable.
+    """
+    global _realtime_client
+
+    url = os.environ.get("SUPABASE_URL")
+    key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
+    if not url or not key:
+        return False
+
+    try:
+        from supabase import acreate_client
+
+        async def connect():
+            client = await acreate_client(url, key)
+            await client.realtime.connect()
+            channel = client.channel("agent-configs-changes")
+            channel.on_postgres_changes(
+                "*", schema="public", table="agent_configs", callback=_on_postgres_change
+            )
+            await channel.subscribe()
+            return client
+
+        _realtime_client = await asyncio.wait_for(connect(), timeout)
+        log.info("Subscribed to agent_configs realtime changes")
+        return True
+    except Exception as e:
+        log.warning("agent_configs realtime listener unavailable, relying on TTL: %s", e)
+        return False
@@ -1,27 +1,56 @@
 import os
-from supabase import create_client, Client
-from functools import lru_cache
+import asyncio
+import hashlib
+import json
 from typing import List, Dict, Optional
 from dotenv import load_dotenv
+from core import config_events
+from core.cache import TTLCache
+from core.logger import get_logger
+from core.supabase_client import get_supabase
 
 load_dotenv()
 
-# Initialize Supabase Client
-url: str = os.environ.get("SUPABASE_URL", "http://localhost:8000") # Default to local Kong if not set
-key: str = os.environ.get("SUPABASE_SERVICE_ROLE_KEY", "")
+log = get_logger(__name__)
 
-# In a real production setup, you might want to handle connection errors gracefully
-try:
-    supabase: Client = create_client(url, key)
-except Exception as e:
-    print(f"Warning: Failed to initialize Supabase client: {e}")
-    supabase = None
+# Agent config cache: fresh for AGENT_CONFIG_TTL seconds, then served stale for
+# up to AGENT_CONFIG_STALE_TTL while a background refresh runs. Missing agents
+# and fallback configs are only remembered for AGENT_CONFIG_NEGATIVE_TTL.
+agent_config_cache = TTLCache(
+    maxsize=int(os.environ.get("AGENT_CONFIG_CACHE_SIZE", "500")),
+    ttl=float(os.environ.get("AGENT_CONFIG_TTL", "300")),
+    negative_ttl=float(os.environ.get("AGENT_CONFIG_NEGATIVE_TTL", "10")),
+    stale_ttl=float(os.environ.get("AGENT_CONFIG_STALE_TTL", "600")),
+    is_negative=lambda config: config is None or config.get("is_fallback", False),
+)
+
+def _fallback_config(slug: str) -> Optional[Dict]:
+    # Fallback for when DB is not ready or for 'general' if not found
+    if slug == "general":
+        return {
+            "name": "General Assistant",
+            "system_prompt": "You are a helpful AI assistant.",
+            "model_provider": "openai",
+            "model_name": "gpt-3.5-turbo",
+            "is_fallback": True,
+            "config_version": "fallback"
+        }
+    return None
+
+def config_version(agent_config: Dict) -> str:
+    """
+    Content hash of an agent config row. Caches derived from a config (tool
+    sets, responses) key on it so an edit is picked up without coordination.
+    """
+    payload = json.dumps(agent_config, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
 
 def get_all_agents() -> List[Dict]:
     """
     Fetch all active agents for the UI dropdown.
     Returns a list of dicts with id, name, slug.
     """
+    supabase = get_supabase()
     if not supabase:
         return []
     
@@ -32,25 +61,36 @@ def get_all_agents() -> List[Dict]:
             .execute()
         return response.data
     except Exception as e:
-        print(f"Error fetching agents: {e}")
+        log.error("Error fetching agents: %s", e)
         return []
 
-@lru_cache(maxsize=100)
-def get_agent_config(slug: str) -> Optional[Dict]:
+def _prepare_config(agent_config: Dict) -> Dict:
+    """Stamp config_version and resolve the Vault-stored model key, if any."""
+    agent_config["config_version"] = config_version(agent_config)
+
+    # Check for Vault secret
+    if agent_config.get("model_api_key_id"):
+        try:
+            secret_response = get_supabase().rpc(
+                "get_decrypted_secret", 
+                {"secret_id": agent_config["model_api_key_id"]}
+            ).execute()
+            if secret_response.data:
+                # Inject into config (in memory only)
+                agent_config["model_api_key"] = secret_response.data
+        except Exception as e:
+            log.error("Error fetching vault secret for %s: %s", agent_config.get("slug"), e)
+
+    return agent_config
+
+def fetch_agent_config(slug: str) -> Optional[Dict]:
     """
-    Fetch a specific agent's configuration by slug.
-    Cached to avoid hitting DB on every chat message.
+    Fetch a specific agent's configuration by slug straight from the DB.
+    Use get_agent_config / get_agent_config_async for the cached path.
     """
+    supabase = get_supabase()
     if not supabase:
-        # Fallback for when DB is not ready or for 'general' if not found
-        if slug == "general":
-            return {
-                "name": "General Assistant",
-                "system_prompt": "You are a helpful AI assistant.",
-                "model_provider": "openai",
-                "model_name": "gpt-3.5-turbo"
-            }
-        return None
+        return _fallback_config(slug)
 
     try:
         response = supabase.table("agent_configs")\
@@ -58,39 +98,94 @@ def get_agent_config(slug: str) -> Optional[Dict]:
             .eq("slug", slug)\
             .single()\
             .execute()
-        agent_config = response.data
-        
-        # Check for Vault secret
-        if agent_config.get("model_api_key_id"):
-            try:
-                secret_response = supabase.rpc(
-                    "get_decrypted_secret", 
-                    {"secret_id": agent_config["model_api_key_id"]}
-                ).execute()
-                if secret_response.data:
-                    # Inject into config (in memory only)
-                    agent_config["model_api_key"] = secret_response.data
-            except Exception as e:
-                print(f"Error fetching vault secret for {slug}: {e}")
-                
-        return agent_config
+        return _prepare_config(response.data)
     except Exception as e:
-        print(f"Error fetching agent config for {slug}: {e}")
+        log.error("Error fetching agent config for %s: %s", slug, e)
         # Fallback for general if DB fails
-        if slug == "general":
-            return {
-                "name": "General Assistant",
-                "system_prompt": "You are a helpful AI assistant.",
-                "model_provider": "openai",
-                "model_name": "gpt-3.5-turbo"
-            }
-        return None
-
-def clear_agent_cache(slug: str):
-    """
-    Clear the cache for a specific agent (call this when updating config).
-    Note: lru_cache doesn't support clearing specific keys easily, 
-    so we might need a different caching strategy if updates are frequent.
-    For now, we can just clear the whole cache or rely on TTL if we implemented it.
-    """
-    get_agent_config.cache_clear()
+        return _fallback_config(slug)
+
+def get_agent_config(slug: str) -> Optional[Dict]:
+    """
+    Cached lookup for synchronous callers (voice worker, scripts).
+    Misses go straight to the DB; async code should use get_agent_config_async
+    for single-flight loading and background refresh.
+    """
+    if slug in agent_config_cache:
+        return agent_config_cache.get(slug)
+    agent_config = fetch_agent_config(slug)
+    agent_config_cache.set(slug, agent_config)
+    return agent_config
+
+def fetch_active_agent_configs() -> List[Dict]:
+    """
+    Every active agent's full config in one query, ready to cache. Returns
+    an empty list when the DB is unreachable.
+    """
+    supabase = get_supabase()
+    if not supabase:
+        return []
+
+    try:
+        response = supabase.table("agent_configs")\
+            .select("*")\
+            .eq("is_active", True)\
+            .execute()
+    except Exception as e:
+        log.error("Error preloading agent configs: %s", e)
+        return []
+
+    return [_prepare_config(row) for row in response.data or []]
+
+def preload_agent_configs() -> int:
+    """
+    Load every active agent's full config into the cache, so the first
+    lookup per agent is a cache hit. Used by the voice worker's prewarm,
+    before any event loop uses the cache. Returns the number of configs loaded.
+    """
+    configs = fetch_active_agent_configs()
+    for agent_config in configs:
+        agent_config_cache.set(agent_config["slug"], agent_config)
+    return len(configs)
+
+async def preload_agent_configs_async() -> int:
+    """
+    Async variant of preload_agent_configs for periodic refreshes. The query
+    runs in a worker thread; the cache is only written from the event loop,
+    since TTLCache is not thread-safe.
+    """
+    configs = await asyncio.to_thread(fetch_active_agent_configs)
+    for agent_config in configs:
+        agent_config_cache.set(agent_config["slug"], agent_config)
+    return len(configs)
+
+async def get_all_agents_async() -> List[Dict]:
+    """
+    Async variant of get_all_agents for use inside request handlers.
+    The Supabase client is synchronous, so the query runs in a worker thread
+    instead of blocking the event loop.
+    """
+    return await asyncio.to_thread(get_all_agents)
+
+async def get_agent_config_async(slug: str) -> Optional[Dict]:
+    """
+    Async variant of get_agent_config for use inside request handlers.
+    Concurrent misses for the same slug share a single DB round trip.
+    """
+    return await agent_config_cache.get_or_load(
+        slug, lambda: asyncio.to_thread(fetch_agent_config, slug)
+    )
+
+def clear_agent_cache(slug: Optional[str] = None):
+    """
+    Clear the cache for a specific agent (call this when updating config),
+    or for every agent when slug is None.
+    """
+    if slug is None:
+        agent_config_cache.clear()
+    else:
+        agent_config_cache.invalidate(slug)
+
+def _on_config_change(event_type: str, slug: Optional[str]):
+    clear_agent_cache(slug)
+
+config_events.subscribe(_on_config_change)
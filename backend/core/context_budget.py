@@ -0,0 +1,237 @@
+import os
+import hashlib
+from typing import Any, Dict, List, Optional, Tuple
+import litellm
+from langchain_core.messages import BaseMessage, SystemMessage, ToolMessage
+from core import llm_registry, metrics
+from core.cache import TTLCache
+from core.logger import get_logger
+
+# Keeps the prompt sent on every LLM call inside a token budget.
+#
+# The system prompt and the most recent messages are always sent verbatim.
+# Older turns are replaced by a running summary ("summarize") or dropped
+# ("drop") once the history exceeds the agent's context_max_tokens.
+# Summaries are cached by a hash of the history prefix they cover, so the
+# next turn only summarizes the messages added since.
+
+log = get_logger(__name__)
+
+DEFAULT_CONTEXT_MAX_TOKENS = int(os.getenv("DEFAULT_CONTEXT_MAX_TOKENS", "12000"))
+DEFAULT_CONTEXT_KEEP_RECENT = int(os.getenv("DEFAULT_CONTEXT_KEEP_RECENT", "6"))
+DEFAULT_CONTEXT_STRATEGY = os.getenv("DEFAULT_CONTEXT_STRATEGY", "summarize")
+DEFAULT_TOOL_RESULT_MAX_TOKENS = int(os.getenv("DEFAULT_TOOL_RESULT_MAX_TOKENS", "2000"))
+CONTEXT_SUMMARY_MODEL = os.getenv("CONTEXT_SUMMARY_MODEL", "gpt-4o-mini")
+CONTEXT_SUMMARY_MAX_TOKENS = int(os.getenv("CONTEXT_SUMMARY_MAX_TOKENS", "400"))
+
+# Rough fallback when the tokenizer for a model isn't known
+CHARS_PER_TOKEN = 4
+
+SUMMARY_PROMPT = (
+    "Summarize the earlier part of this conversation for an assistant that will continue it. "
+    "Keep names, numbers, decisions, open questions and anything the user asked to remember. "
+    "Be concise; write plain sentences, no preamble."
+)
+
+context_compactions = metrics.counter(
+    "context_compactions_total", "Chat histories shortened to fit the context budget", ("strategy",)
+)
+tool_results_truncated = metrics.counter(
+    "context_tool_results_truncated_total", "Tool results cut to tool_result_max_tokens"
+)
+
+# (model, text hash) -> token count
+_token_counts = TTLCache(maxsize=8192, ttl=86400)
+# prefix hash -> summary text of that prefix
+_summary_cache = TTLCache(
+    maxsize=int(os.getenv("CONTEXT_SUMMARY_CACHE_SIZE", "2000")),
+    ttl=float(os.getenv("CONTEXT_SUMMARY_CACHE_TTL", "86400")),
+    negative_ttl=0,
+)
+
+
+def _model_provider(model: Optional[str]) -> Optional[str]:
+    if not model:
+        return None
+    try:
+        return litellm.get_llm_provider(model)[1]
+    except Exception:
+        return None
+
+
+class ContextBudget:
+    """Per-agent limits, read from agent_configs (NULL columns use the defaults)."""
+
+    def __init__(self, agent_config: Dict[str, Any]):
+        def setting(column: str, default):
+            value = agent_config.get(column)
+            return default if value is None else value
+
+        self.max_tokens = int(setting("context_max_tokens", DEFAULT_CONTEXT_MAX_TOKENS))
+        self.keep_recent = max(1, int(setting("context_keep_recent", DEFAULT_CONTEXT_KEEP_RECENT)))
+        self.strategy = setting("context_strategy", DEFAULT_CONTEXT_STRATEGY)
+        self.tool_result_max_tokens = int(setting("tool_result_max_tokens", DEFAULT_TOOL_RESULT_MAX_TOKENS))
+        # The agent's key belongs to its own provider; the summary model only
+        # gets it when it is served by the same one, otherwise the env key
+        agent_provider = _model_provider(agent_config.get("model_name")) or agent_config.get("model_provider")
+        summary_provider = _model_provider(CONTEXT_SUMMARY_MODEL)
+        same_provider = summary_provider is not None and (agent_provider or "").lower() == summary_provider
+        self.api_key = agent_config.get("model_api_key") if same_provider else None
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_tokens > 0
+
+
+def _count_text(model: str, text: str) -> int:
+    key = (model, hashlib.sha1(text.encode("utf-8")).digest())
+    count = _token_counts.get(key)
+    if count is None:
+        try:
+            count = litellm.token_counter(model=model, text=text)
+        except Exception:
+            count = len(text) // CHARS_PER_TOKEN + 1
+        _token_counts.set(key, count)
+    return count
+
+
+def count_tokens(model: str, message: BaseMessage) -> int:
+    # Per-message framing overhead of the chat format
+    return _count_text(model, str(message.content)) + 4
+
+
+def count_history(model: str, messages: List[BaseMessage]) -> int:
+    return sum(count_tokens(model, m) for m in messages)
+
+
+def truncate_tool_result(content: str, budget: ContextBudget) -> str:
+    """Cut an oversized tool result, keeping its beginning."""
+    if budget.tool_result_max_tokens <= 0:
+        return content
+    max_chars = budget.tool_result_max_tokens * CHARS_PER_TOKEN
+    if len(content) <= max_chars:
+        return content
+    tool_results_truncated.inc()
+    return content[:max_chars] + f"...(tool result truncated, {len(content) - max_chars} more characters)"
+
+
+def prefix_hashes(messages: List[BaseMessage]) -> List[str]:
+    """hashes[i] identifies messages[:i + 1]; each one extends the previous."""
+    hashes = []
+    digest = ""
+    for message in messages:
+        digest = hashlib.sha1(f"{digest}\x00{message.type}\x00{message.content}".encode("utf-8")).hexdigest()
+        hashes.append(digest)
+    return hashes
+
+
+def _transcript(messages: List[BaseMessage]) -> str:
+    return "\n".join(f"{m.type}: {m.content}" for m in messages)
+
+
+async def _summarize(previous: Optional[str], messages: List[BaseMessage], api_key: Optional[str]) -> str:
+    text = _transcript(messages)
+    if previous:
+        text = f"Summary so far:\n{previous}\n\nNew messages:\n{text}"
+    kwargs = {"api_key": api_key} if api_key else {}
+    response = await llm_registry.acompletion(
+        model=CONTEXT_SUMMARY_MODEL,
+        messages=[{"role": "system", "content": SUMMARY_PROMPT}, {"role": "user", "content": text}],
+        temperature=0.0,
+        max_tokens=CONTEXT_SUMMARY_MAX_TOKENS,
+        **kwargs,
+    )
+    return response.choices[0].message.content.strip()
+
+
+async def summarize_prefix(older: List[BaseMessage], api_key: Optional[str] = None) -> str:
+    """
+    Summary of `older`, built incrementally: start from the longest prefix
+    that already has a cached summary and only fold in the rest.
+    """
+    hashes = prefix_hashes(older)
+    start = 0
+    previous = None
+    for i in range(len(hashes) - 1, -1, -1):
+        cached = _summary_cache.get(hashes[i])
+        if cached is not None:
+            start, previous = i + 1, cached
+            break
+    if start == len(older):
+        return previous
+
+    return await _summary_cache.get_or_load(
+        hashes[-1], lambda: _summarize(previous, older[start:], api_key)
+    )
+
+
+def _split(history: List[BaseMessage], keep_recent: int) -> Tuple[List[BaseMessage], List[BaseMessage]]:
+    cut = max(0, len(history) - keep_recent)
+    # Never separate ToolMessages from the AI message that requested them
+    while 0 < cut < len(history) and isinstance(history[cut], ToolMessage):
+        cut -= 1
+    return history[:cut], history[cut:]
+
+
+async def fit_history(messages: List[BaseMessage], model: str, budget: ContextBudget) -> List[BaseMessage]:
+    """
+    Return the messages to send: leading system messages and the last
+    `keep_recent` messages unchanged, with older turns summarized or dropped
+    if the whole history is over `max_tokens`.
+    """
+    if not budget.enabled:
+        return messages
+
+    head_len = 0
+    while head_len < len(messages) and isinstance(messages[head_len], SystemMessage):
+        head_len += 1
+    head, history = messages[:head_len], messages[head_len:]
+
+    if count_history(model, messages) <= budget.max_tokens:
+        return messages
+    older, recent = _split(history, budget.keep_recent)
+    if not older:
+        return messages
+
+    if budget.strategy == "summarize":
+        try:
+            summary = await summarize_prefix(older, budget.api_key)
+            context_compactions.inc(strategy="summarize")
+            note = SystemMessage(content=f"Summary of the earlier conversation:\n{summary}")
+            return head + [note] + recent
+        except Exception as e:
+            log.warning("Context summary failed, dropping older turns instead: %s", e)
+
+    # drop: keep as many of the newest older turns as still fit
+    context_compactions.inc(strategy="drop")
+    available = budget.max_tokens - count_history(model, head + recent)
+    kept: List[BaseMessage] = []
+    for message in reversed(older):
+        available -= count_tokens(model, message)
+        if available < 0:
+            break
+        kept.insert(0, message)
+    while kept and isinstance(kept[0], ToolMessage):
+        kept.pop(0)
+    return head + kept + recent
+
+
+def shrink_tool_messages(messages: List[BaseMessage], model: str, budget: ContextBudget) -> None:
+    """
+    Inside one ReAct run: when tool results push the prompt over budget, cut
+    older ToolMessages down further (newest first kept intact). Modifies in place.
+    """
+    if not budget.enabled or count_history(model, messages) <= budget.max_tokens:
+        return
+    tool_indexes = [i for i, m in enumerate(messages) if isinstance(m, ToolMessage)]
+    floor_chars = 200 * CHARS_PER_TOKEN
+    for i in tool_indexes[:-1]:
+        message = messages[i]
+        if len(message.content) > floor_chars:
+            messages[i] = ToolMessage(
+                tool_call_id=message.tool_call_id,
+                name=message.name,
+                content=message.content[:floor_chars] + "...(earlier tool result shortened)",
+            )
+            if count_history(model, messages) <= budget.max_tokens:
+                return
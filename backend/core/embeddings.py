@@ -0,0 +1,88 @@
+import math
+import re
+import zlib
+from typing import Dict, Iterable, List
+
+# Sparse vector: hashed feature id -> weight (L2-normalised)
+SparseVector = Dict[int, float]
+
+NUM_FEATURES = 1 << 18
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+_STOPWORDS = frozenset("""
+a an and are as at be but by can could do does for from has have how i if in
+into is it its me my of on or please should so that the their them then there
+these this to us was we what when where which who why will with would you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def _features(text: str) -> Iterable[str]:
+    tokens = tokenize(text)
+    for token in tokens:
+        yield "w:" + token
+        # Character trigrams make the vector robust to inflections and typos
+        padded = f" {token} "
+        for i in range(len(padded) - 2):
+            yield "c:" + padded[i:i + 3]
+    for first, second in zip(tokens, tokens[1:]):
+        yield f"b:{first}_{second}"
+
+
+def _hash(feature: str) -> int:
+    # crc32 rather than hash() so vectors are stable across processes
+    return zlib.crc32(feature.encode("utf-8")) % NUM_FEATURES
+
+
+def term_frequencies(text: str) -> Dict[int, float]:
+    counts: Dict[int, float] = {}
+    for feature in _features(text):
+        index = _hash(feature)
+        counts[index] = counts.get(index, 0.0) + 1.0
+    # Sublinear tf so long descriptions don't drown out short ones
+    return {index: 1.0 + math.log(count) for index, count in counts.items()}
+
+
+def normalize(vector: Dict[int, float]) -> SparseVector:
+    norm = math.sqrt(sum(w * w for w in vector.values()))
+    if norm == 0:
+        return {}
+    return {index: w / norm for index, w in vector.items()}
+
+
+def cosine(a: SparseVector, b: SparseVector) -> float:
+    """Dot product of two normalised sparse vectors."""
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(w * b.get(index, 0.0) for index, w in a.items())
+
+
+class TextVectorizer:
+    """
+    Hashed tf-idf vectorizer that runs locally in pure Python.
+
+    fit() learns idf weights from a small corpus (e.g. agent descriptions);
+    features never seen in the corpus get the maximum idf.
+    """
+
+    def __init__(self):
+        self.idf: Dict[int, float] = {}
+        self.default_idf = 1.0
+
+    def fit(self, documents: List[str]) -> "TextVectorizer":
+        doc_freq: Dict[int, int] = {}
+        for document in documents:
+            for index in term_frequencies(document):
+                doc_freq[index] = doc_freq.get(index, 0) + 1
+        n = len(documents)
+        self.idf = {index: math.log((1 + n) / (1 + df)) + 1.0 for index, df in doc_freq.items()}
+        self.default_idf = math.log(1 + n) + 1.0
+        return self
+
+    def transform(self, text: str) -> SparseVector:
+        tf = term_frequencies(text)
+        return normalize({index: w * self.idf.get(index, self.default_idf) for index, w in tf.items()})
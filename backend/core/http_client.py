@@ -0,0 +1,155 @@
+import os
+import asyncio
+import random
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+from urllib.parse import urlsplit
+import httpx
+
+# Shared outbound HTTP layer for tools (n8n, scraper, custom webhooks).
+# One pooled keep-alive client per event loop, so repeated calls to the same
+# host reuse TCP/TLS connections instead of handshaking every time.
+
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "200"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "50"))
+HTTP_PER_HOST_CONCURRENCY = int(os.getenv("HTTP_PER_HOST_CONCURRENCY", "20"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+HTTP_RETRY_BACKOFF = float(os.getenv("HTTP_RETRY_BACKOFF", "0.25"))
+HTTP_MAX_RETRY_AFTER = float(os.getenv("HTTP_MAX_RETRY_AFTER", "5"))
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRY_STATUSES = {429, 502, 503, 504}
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_host_limits: Dict[str, asyncio.Semaphore] = {}
+
+
+def make_timeout(read: Optional[float] = None, connect: Optional[float] = None) -> httpx.Timeout:
+    return httpx.Timeout(
+        read if read is not None else HTTP_READ_TIMEOUT,
+        connect=connect if connect is not None else HTTP_CONNECT_TIMEOUT,
+    )
+
+
+def get_client() -> httpx.AsyncClient:
+    """
+    Return the pooled client for the running event loop.
+    """
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client_loop is not loop or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=make_timeout(),
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            ),
+            follow_redirects=True,
+        )
+        _client_loop = loop
+        _host_limits.clear()
+    return _client
+
+
+def host_limit(url: str) -> asyncio.Semaphore:
+    """
+    Per-host concurrency limit, so one slow upstream can't take the whole pool.
+    """
+    host = urlsplit(url).netloc.lower()
+    semaphore = _host_limits.get(host)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(HTTP_PER_HOST_CONCURRENCY)
+        _host_limits[host] = semaphore
+    return semaphore
+
+
+def _retry_delay(attempt: int, response: Optional[httpx.Response] = None) -> float:
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), HTTP_MAX_RETRY_AFTER)
+    # Exponential backoff with full jitter
+    return random.uniform(0, HTTP_RETRY_BACKOFF * (2 ** attempt))
+
+
+async def request(
+    method: str,
+    url: str,
+    *,
+    timeout: Optional[float] = None,
+    retries: Optional[int] = None,
+    idempotent: Optional[bool] = None,
+    host_limited: bool = True,
+    **kwargs: Any,
+) -> httpx.Response:
+    """
+    Send a request through the shared pool.
+
+    Failures where the request never reached the server (connect errors,
+    pool timeouts) are always retried. Read timeouts, dropped connections and
+    429/502/503/504 responses are retried only for idempotent requests, so a
+    webhook POST is never executed twice.
+
+    host_limited=False skips the per-host limit, for long-held calls (n8n
+    background jobs) that would otherwise starve short ones to the same host.
+    """
+    method = method.upper()
+    if retries is None:
+        retries = HTTP_MAX_RETRIES
+    if idempotent is None:
+        idempotent = method in IDEMPOTENT_METHODS
+    if timeout is not None:
+        kwargs["timeout"] = make_timeout(read=timeout)
+
+    client = get_client()
+    attempt = 0
+    while True:
+        response = None
+        try:
+            if host_limited:
+                async with host_limit(url):
+                    response = await client.request(method, url, **kwargs)
+            else:
+                response = await client.request(method, url, **kwargs)
+            if not (idempotent and response.status_code in RETRY_STATUSES and attempt < retries):
+                return response
+            await response.aclose()
+        except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout):
+            if attempt >= retries:
+                raise
+        except (httpx.ReadTimeout, httpx.RemoteProtocolError, httpx.ReadError):
+            if not idempotent or attempt >= retries:
+                raise
+        await asyncio.sleep(_retry_delay(attempt, response))
+        attempt += 1
+
+
+@asynccontextmanager
+async def stream(method: str, url: str, *, timeout: Optional[float] = None, **kwargs: Any) -> AsyncIterator[httpx.Response]:
+    """
+    Open a streaming response through the shared pool. The body is read by
+    the caller, so it can stop early; leaving the block releases the
+    connection. Not retried.
+    """
+    if timeout is not None:
+        kwargs["timeout"] = make_timeout(read=timeout)
+    async with host_limit(url):
+        async with get_client().stream(method.upper(), url, **kwargs) as response:
+            yield response
+
+
+async def aclose() -> None:
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
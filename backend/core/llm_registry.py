@@ -0,0 +1,127 @@
+import os
+import asyncio
+import hashlib
+import json
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+import httpx
+import litellm
+from langchain_community.chat_models import ChatLiteLLM
+
+# Shared model clients for the chat path and the Orchestrator.
+#
+# Default per-model limits, overridable per model with LLM_MODEL_LIMITS, e.g.
+#   LLM_MODEL_LIMITS='{"gpt-4o": {"concurrency": 32, "rpm": 500}}'
+# rpm = 0 disables rate limiting for that model.
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "64"))
+LLM_RPM_LIMIT = float(os.getenv("LLM_RPM_LIMIT", "0"))
+LLM_RATE_BURST_SECONDS = float(os.getenv("LLM_RATE_BURST_SECONDS", "5"))
+LLM_MODEL_LIMITS: Dict[str, Dict[str, float]] = json.loads(os.getenv("LLM_MODEL_LIMITS", "{}"))
+LLM_POOL_CONNECTIONS = int(os.getenv("LLM_POOL_CONNECTIONS", "200"))
+
+# Set OpenAI API key for LiteLLM
+litellm.api_key = os.getenv("OPENAI_API_KEY")
+
+
+class TokenBucket:
+    """Requests-per-minute limiter; waits instead of failing when empty."""
+
+    def __init__(self, rpm: float, burst_seconds: float = LLM_RATE_BURST_SECONDS):
+        self.rate = rpm / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self) -> None:
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class ModelLimiter:
+    def __init__(self, model: str):
+        limits = LLM_MODEL_LIMITS.get(model, {})
+        self.concurrency = int(limits.get("concurrency", LLM_MAX_CONCURRENCY))
+        rpm = float(limits.get("rpm", LLM_RPM_LIMIT))
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        self.bucket = TokenBucket(rpm) if rpm > 0 else None
+
+
+_models: Dict[Tuple[str, float, str], ChatLiteLLM] = {}
+_limiters: Dict[str, ModelLimiter] = {}
+
+
+def key_source(api_key: Optional[str]) -> str:
+    """Identify where a key came from without keeping the key in the cache key."""
+    if not api_key or api_key == os.getenv("OPENAI_API_KEY"):
+        return "env"
+    return "key:" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+
+
+def get_chat_model(model: str, temperature: float, api_key: Optional[str] = None) -> ChatLiteLLM:
+    """
+    Return the shared ChatLiteLLM for (model, temperature, key source),
+    constructing it on first use only.
+    """
+    api_key = api_key or os.getenv("OPENAI_API_KEY")
+    cache_key = (model, float(temperature), key_source(api_key))
+    llm = _models.get(cache_key)
+    if llm is None:
+        llm = ChatLiteLLM(model=model, temperature=temperature, api_key=api_key)
+        _models[cache_key] = llm
+    return llm
+
+
+def get_limiter(model: str) -> ModelLimiter:
+    limiter = _limiters.get(model)
+    if limiter is None:
+        limiter = ModelLimiter(model)
+        _limiters[model] = limiter
+    return limiter
+
+
+@asynccontextmanager
+async def model_slot(model: str) -> AsyncIterator[None]:
+    """
+    Hold one of the model's concurrency slots (and a rate-limit token) for
+    the duration of an LLM call or stream.
+    """
+    limiter = get_limiter(model)
+    async with limiter.semaphore:
+        if limiter.bucket is not None:
+            await limiter.bucket.acquire()
+        yield
+
+
+async def acompletion(model: str, **kwargs: Any) -> Any:
+    """litellm.acompletion under the same per-model limits as the chat path."""
+    async with model_slot(model):
+        return await litellm.acompletion(model=model, **kwargs)
+
+
+def configure_sessions() -> None:
+    """
+    Give LiteLLM one long-lived pooled HTTP session so provider connections
+    stay warm across requests. Call from inside the serving event loop.
+    """
+    if litellm.aclient_session is None:
+        litellm.aclient_session = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=LLM_POOL_CONNECTIONS,
+                max_keepalive_connections=LLM_POOL_CONNECTIONS,
+            ),
+            timeout=httpx.Timeout(600.0, connect=5.0),
+        )
+
+
+async def aclose_sessions() -> None:
+    session = litellm.aclient_session
+    litellm.aclient_session = None
+    if session is not None:
+        await session.aclose()
@@ -0,0 +1,59 @@
+import os
+import logging
+import random
+from typing import Any, Optional
+
+# Level-gated logging for the request path.
+#
+# LOG_LEVEL filters by severity as usual. LOG_SAMPLE_RATE (0..1) additionally
+# keeps only that fraction of debug/info lines, so per-request logging can be
+# left on under load; warnings and errors are never sampled. Arguments are
+# formatted only for lines that are actually emitted.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+
+_configured = False
+
+
+def _configure() -> None:
+    global _configured
+    if _configured:
+        return
+    logging.basicConfig(
+        level=getattr(logging, LOG_LEVEL, logging.INFO),
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+    _configured = True
+
+
+class SampledLogger:
+    def __init__(self, logger: logging.Logger, sample_rate: float = LOG_SAMPLE_RATE):
+        self._logger = logger
+        self.sample_rate = sample_rate
+
+    def _sampled(self, level: int) -> bool:
+        if not self._logger.isEnabledFor(level):
+            return False
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def debug(self, msg: str, *args: Any) -> None:
+        if self._sampled(logging.DEBUG):
+            self._logger.debug(msg, *args)
+
+    def info(self, msg: str, *args: Any) -> None:
+        if self._sampled(logging.INFO):
+            self._logger.info(msg, *args)
+
+    def warning(self, msg: str, *args: Any) -> None:
+        self._logger.warning(msg, *args)
+
+    def error(self, msg: str, *args: Any) -> None:
+        self._logger.error(msg, *args)
+
+    def exception(self, msg: str, *args: Any) -> None:
+        self._logger.exception(msg, *args)
+
+
+def get_logger(name: str, sample_rate: Optional[float] = None) -> SampledLogger:
+    _configure()
+    return SampledLogger(logging.getLogger(name), LOG_SAMPLE_RATE if sample_rate is None else sample_rate)
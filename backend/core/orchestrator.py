@@ -1,43 +1,107 @@
 import os
+import asyncio
+import random
 from typing import List, Optional
-from supabase import create_client, Client
-from litellm import completion
+from core import llm_registry, metrics
+from core.agent_catalog import AgentCatalog, CatalogSnapshot
+from core.cache import TTLCache
+from core.logger import get_logger
+from core.router import FastRouter
+from core.supabase_client import get_supabase
+from core.text import normalize_message
+
+# Fraction of fast-path decisions that are re-checked by the LLM in the
+# background, so fast/LLM agreement can be measured without adding latency.
+ROUTER_SHADOW_SAMPLE_RATE = float(os.getenv("ROUTER_SHADOW_SAMPLE_RATE", "0.05"))
+FAST_ROUTER_ENABLED = os.getenv("FAST_ROUTER_ENABLED", "true").lower() == "true"
+
+routing_decisions = metrics.counter(
+    "router_decisions_total", "Auto-pilot routing decisions by tier", ("tier",)
+)
+routing_agreement = metrics.counter(
+    "router_fast_llm_agreement_total",
+    "Comparisons between the fast-path pick and the LLM pick",
+    ("result",),
+)
+routing_cache_requests = metrics.counter(
+    "router_cache_requests_total", "Routing decision cache lookups", ("result",)
+)
+
+log = get_logger(__name__)
 
 class Orchestrator:
     def __init__(self):
-        url = os.getenv("SUPABASE_URL")
-        key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-        
-        if not url or not key:
-            print("Warning: SUPABASE_URL or SUPABASE_SERVICE_ROLE_KEY not set for Orchestrator")
-            self.supabase = None
-        else:
-            self.supabase: Client = create_client(url, key)
-
-    def route_request(self, user_message: str) -> str:
-        if not self.supabase:
+        supabase = get_supabase()
+        self.catalog = AgentCatalog(supabase) if supabase else None
+        self.fast_router = FastRouter()
+        self._background_tasks = set()
+        # Routing decisions keyed on (catalog version, normalized message).
+        # Failed decisions (None) are never kept.
+        self.decision_cache = TTLCache(
+            maxsize=int(os.getenv("ROUTER_CACHE_SIZE", "5000")),
+            ttl=float(os.getenv("ROUTER_CACHE_TTL", "3600")),
+            negative_ttl=0,
+        )
+        self._cached_slugs = frozenset()
+
+    async def route_request(self, user_message: str) -> str:
+        if not self.catalog:
             return "general"
 
-        # 1. Fetch all agents
+        # 1. Get the agent catalog (in memory, refreshed only on changes)
         try:
-            response = self.supabase.table("agent_configs").select("name, slug, description, system_prompt").execute()
-            agents = response.data
+            catalog = await self.catalog.snapshot()
         except Exception as e:
-            print(f"Orchestrator DB Error: {e}")
+            log.error("Orchestrator DB error: %s", e)
             return "general"
         
-        if not agents:
+        if not catalog.slugs:
             return "general"
 
-        # 2. Construct prompt
-        agent_descriptions = ""
-        for agent in agents:
-            desc = agent.get("description")
-            # Fallback to system prompt snippet if description is empty
-            if not desc:
-                 desc = (agent.get("system_prompt") or "")[:150].replace("\n", " ") + "..."
-            
-            agent_descriptions += f"- {agent['name']} (slug: {agent['slug']}): {desc}\n"
+        # 2. Routing cache. The catalog version is part of the key; when agents
+        # are added or removed every entry is dropped right away.
+        if catalog.slugs != self._cached_slugs:
+            self.decision_cache.clear()
+            self._cached_slugs = catalog.slugs
+
+        key = (catalog.version, normalize_message(user_message))
+        routing_cache_requests.inc(result="hit" if key in self.decision_cache else "miss")
+        selected_slug = await self.decision_cache.get_or_load(
+            key, lambda: self._decide(user_message, catalog)
+        )
+        return selected_slug or "general"
+
+    async def _decide(self, user_message: str, catalog: CatalogSnapshot) -> Optional[str]:
+        # Fast path: local similarity routing when one agent clearly wins
+        decision = self.fast_router.route(user_message, catalog) if FAST_ROUTER_ENABLED else None
+        if decision and decision.confident:
+            routing_decisions.inc(tier="fast")
+            log.info("Fast-path routed to %s (score %.2f, margin %.2f)", decision.slug, decision.score, decision.margin)
+            if random.random() < ROUTER_SHADOW_SAMPLE_RATE:
+                task = asyncio.ensure_future(self._shadow_check(user_message, catalog, decision.slug))
+                self._background_tasks.add(task)
+                task.add_done_callback(self._background_tasks.discard)
+            return decision.slug
+
+        # Close call: ask the LLM
+        routing_decisions.inc(tier="llm")
+        selected_slug = await self._llm_route(user_message, catalog)
+        if selected_slug and decision and decision.slug:
+            routing_agreement.inc(result="agree" if decision.slug == selected_slug else "disagree")
+        return selected_slug
+
+    async def _shadow_check(self, user_message: str, catalog: CatalogSnapshot, fast_slug: str):
+        llm_slug = await self._llm_route(user_message, catalog)
+        if llm_slug:
+            routing_agreement.inc(result="agree" if llm_slug == fast_slug else "disagree")
+
+    async def _llm_route(self, user_message: str, catalog: CatalogSnapshot) -> Optional[str]:
+        """
+        Ask the LLM to pick an agent. Returns None if the call itself failed,
+        so callers can tell an error apart from a deliberate 'general'.
+        """
+        # Construct prompt
+        agent_descriptions = catalog.prompt_fragment
 
         prompt = f"""
 You are the Orchestrator. Your job is to route the user's request to the most suitable AI agent based on their description.
@@ -54,10 +118,10 @@ Instructions:
 - Return ONLY the slug of the chosen agent. Do not add any explanation or punctuation.
 """
 
-        # 3. Call LLM
+        # Call LLM
         try:
             # Using gpt-4o-mini for speed and cost
-            response = completion(
+            response = await llm_registry.acompletion(
                 model="gpt-4o-mini",
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.0
@@ -68,14 +132,13 @@ Instructions:
             selected_slug = selected_slug.replace("'", "").replace('"', "")
             
             # Validate slug exists
-            valid_slugs = [a['slug'] for a in agents]
-            if selected_slug not in valid_slugs:
-                print(f"Orchestrator returned invalid slug '{selected_slug}', defaulting to 'general'")
+            if selected_slug not in catalog.slugs:
+                log.warning("Orchestrator returned invalid slug '%s', defaulting to 'general'", selected_slug)
                 return "general"
             
-            print(f"✈️ Auto-Pilot routed to: {selected_slug}")
+            log.info("LLM routed to %s", selected_slug)
             return selected_slug
             
         except Exception as e:
-            print(f"Orchestrator LLM Error: {e}")
-            return "general"
+            log.error("Orchestrator LLM error: %s", e)
+            return None
@@ -0,0 +1,40 @@
+import os
+import asyncio
+from typing import Optional
+from core.logger import get_logger
+
+log = get_logger(__name__)
+
+# Optional shared cache tier. Unset REDIS_URL (or a missing redis package)
+# simply means every cache stays in-process.
+REDIS_URL = os.getenv("REDIS_URL", "")
+
+_client = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_redis():
+    """
+    Return a redis.asyncio client for the running event loop, or None when
+    Redis isn't configured.
+    """
+    global _client, _client_loop
+    if not REDIS_URL:
+        return None
+    loop = asyncio.get_running_loop()
+    if _client is None or _client_loop is not loop:
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            log.warning("REDIS_URL is set but the redis package is not installed")
+            return None
+        _client = redis.from_url(REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5)
+        _client_loop = loop
+    return _client
+
+
+async def aclose() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+    _client = None
@@ -0,0 +1,141 @@
+import os
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from core import metrics
+from core.cache import TTLCache
+from core.embeddings import SparseVector, cosine, normalize, term_frequencies
+from core.text import normalize_message
+
+# Opt-in answer cache for deterministic agents (temperature 0 and
+# response_cache_enabled in agent_configs).
+#
+# Exact tier: keyed on (agent, config version, model, normalized history).
+# Similarity tier (response_cache_similarity set): same agent, config,
+# model and earlier turns, and a last user message whose local hashed
+# vector is close enough to one already answered.
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "5000"))
+DEFAULT_RESPONSE_CACHE_TTL = float(os.getenv("DEFAULT_RESPONSE_CACHE_TTL", "3600"))
+# Candidates kept per (agent, config, context) for similarity matching
+RESPONSE_CACHE_SIMILAR_PER_CONTEXT = int(os.getenv("RESPONSE_CACHE_SIMILAR_PER_CONTEXT", "256"))
+
+# Turns that ran any other tool (webhooks, custom tools) have side effects
+# and are never cached.
+CACHEABLE_TOOLS = {"web_search", "web_scraper", "web_scraper_batch"}
+
+response_cache_requests = metrics.counter(
+    "response_cache_requests_total", "Response cache lookups for cache-enabled agents", ("result",)
+)
+
+
+class CacheKey:
+    """Where a turn's answer is stored and what to compare for similarity."""
+
+    def __init__(self, context: str, exact: str, vector: SparseVector, ttl: float, min_similarity: Optional[float]):
+        self.context = context
+        self.exact = exact
+        self.vector = vector
+        self.ttl = ttl
+        self.min_similarity = min_similarity
+
+
+class ResponseCache:
+    def __init__(self, maxsize: int = RESPONSE_CACHE_SIZE):
+        self._answers = TTLCache(maxsize=maxsize, ttl=DEFAULT_RESPONSE_CACHE_TTL, negative_ttl=0)
+        # context -> exact key -> (vector, expires_at), oldest first
+        self._similar: "OrderedDict[str, OrderedDict[str, Tuple[SparseVector, float]]]" = OrderedDict()
+
+    def lookup(self, key: CacheKey) -> Optional[Tuple[str, str]]:
+        """Return (answer, "exact" | "similar") or None."""
+        answer = self._answers.get(key.exact)
+        if answer is not None:
+            response_cache_requests.inc(result="exact")
+            return answer, "exact"
+
+        if key.min_similarity is not None and key.vector:
+            match = self._best_match(key)
+            if match is not None:
+                answer = self._answers.get(match)
+                if answer is not None:
+                    response_cache_requests.inc(result="similar")
+                    return answer, "similar"
+
+        response_cache_requests.inc(result="miss")
+        return None
+
+    def _best_match(self, key: CacheKey) -> Optional[str]:
+        candidates = self._similar.get(key.context)
+        if not candidates:
+            return None
+        now = time.monotonic()
+        best, best_score = None, key.min_similarity
+        for exact, (vector, expires_at) in list(candidates.items()):
+            if expires_at <= now:
+                del candidates[exact]
+                continue
+            score = cosine(key.vector, vector)
+            if score >= best_score:
+                best, best_score = exact, score
+        return best
+
+    def store(self, key: CacheKey, answer: str) -> None:
+        self._answers.set(key.exact, answer, ttl=key.ttl)
+        if key.min_similarity is None or not key.vector:
+            return
+        candidates = self._similar.setdefault(key.context, OrderedDict())
+        candidates[key.exact] = (key.vector, time.monotonic() + key.ttl)
+        candidates.move_to_end(key.exact)
+        while len(candidates) > RESPONSE_CACHE_SIMILAR_PER_CONTEXT:
+            candidates.popitem(last=False)
+        self._similar.move_to_end(key.context)
+        while len(self._similar) > RESPONSE_CACHE_SIZE:
+            self._similar.popitem(last=False)
+
+    def clear(self) -> None:
+        self._answers.clear()
+        self._similar.clear()
+
+
+response_cache = ResponseCache()
+
+
+def is_cacheable_agent(agent_config: Dict[str, Any]) -> bool:
+    return bool(agent_config.get("response_cache_enabled")) and agent_config.get("temperature") == 0
+
+
+def _digest(parts: Any) -> str:
+    return hashlib.sha1(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def build_key(
+    agent_slug: str, agent_config: Dict[str, Any], model_name: str, history: List[BaseMessage]
+) -> Optional[CacheKey]:
+    """
+    Key for a turn whose last message is the user's question, or None when
+    the agent hasn't opted in. Tool calls and tool results don't take part;
+    only what the user and assistant said does.
+    """
+    if not is_cacheable_agent(agent_config) or not history or not isinstance(history[-1], HumanMessage):
+        return None
+
+    turns = [
+        (m.type, normalize_message(str(m.content)))
+        for m in history
+        if isinstance(m, (HumanMessage, AIMessage)) and m.content
+    ]
+    context = _digest([agent_slug, agent_config.get("config_version"), model_name, turns[:-1]])
+    exact = _digest([context, turns[-1]])
+
+    ttl = agent_config.get("response_cache_ttl_seconds") or DEFAULT_RESPONSE_CACHE_TTL
+    min_similarity = agent_config.get("response_cache_similarity")
+    vector = normalize(term_frequencies(turns[-1][1])) if min_similarity is not None else {}
+    return CacheKey(context, exact, vector, float(ttl), min_similarity)
+
+
+def turn_is_cacheable(turn: List[BaseMessage]) -> bool:
+    """True if every tool used in this turn is read-only."""
+    return all(m.name in CACHEABLE_TOOLS for m in turn if isinstance(m, ToolMessage))
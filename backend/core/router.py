@@ -0,0 +1,70 @@
+import os
+from typing import Dict, List, Optional, Tuple
+from core.agent_catalog import CatalogSnapshot
+from core.embeddings import SparseVector, TextVectorizer, cosine
+
+# The fast path is taken only if the best agent scores at least MIN_SCORE and
+# beats the runner-up by at least MIN_MARGIN; otherwise the LLM decides.
+ROUTER_MIN_SCORE = float(os.getenv("ROUTER_MIN_SCORE", "0.2"))
+ROUTER_MIN_MARGIN = float(os.getenv("ROUTER_MIN_MARGIN", "0.1"))
+
+
+def agent_document(agent: Dict) -> str:
+    """Text that represents an agent for similarity routing."""
+    parts = [agent.get("name") or "", agent.get("slug") or "", agent.get("description") or ""]
+    parts.append((agent.get("system_prompt") or "")[:500])
+    return "\n".join(parts)
+
+
+class RouteDecision:
+    def __init__(self, slug: Optional[str], score: float, runner_up_score: float, confident: bool):
+        self.slug = slug
+        self.score = score
+        self.runner_up_score = runner_up_score
+        self.confident = confident
+
+    @property
+    def margin(self) -> float:
+        return self.score - self.runner_up_score
+
+
+class FastRouter:
+    """
+    Local similarity router placed in front of the LLM Orchestrator.
+
+    The vectors of the agent descriptions are computed once per catalog
+    version. Routing a message costs one vectorization plus a sparse dot
+    product per agent.
+    """
+
+    def __init__(self, min_score: float = ROUTER_MIN_SCORE, min_margin: float = ROUTER_MIN_MARGIN):
+        self.min_score = min_score
+        self.min_margin = min_margin
+        self._version: Optional[int] = None
+        self._vectorizer = TextVectorizer()
+        self._agent_vectors: List[Tuple[str, SparseVector]] = []
+
+    def _ensure_index(self, catalog: CatalogSnapshot) -> None:
+        if self._version == catalog.version:
+            return
+        slugs = sorted(catalog.agents)
+        documents = [agent_document(catalog.agents[slug]) for slug in slugs]
+        vectorizer = TextVectorizer().fit(documents)
+        self._agent_vectors = [(slug, vectorizer.transform(doc)) for slug, doc in zip(slugs, documents)]
+        self._vectorizer = vectorizer
+        self._version = catalog.version
+
+    def route(self, user_message: str, catalog: CatalogSnapshot) -> RouteDecision:
+        self._ensure_index(catalog)
+        if not self._agent_vectors:
+            return RouteDecision(None, 0.0, 0.0, False)
+
+        query = self._vectorizer.transform(user_message)
+        scores = sorted(
+            ((cosine(query, vector), slug) for slug, vector in self._agent_vectors),
+            reverse=True,
+        )
+        best_score, best_slug = scores[0]
+        runner_up = scores[1][0] if len(scores) > 1 else 0.0
+        confident = best_score >= self.min_score and best_score - runner_up >= self.min_margin
+        return RouteDecision(best_slug, best_score, runner_up, confident)
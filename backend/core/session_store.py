@@ -0,0 +1,135 @@
+import os
+import json
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import List, Optional
+from langchain_core.messages import BaseMessage, ToolMessage, messages_from_dict, messages_to_dict
+from core.redis_client import REDIS_URL, get_redis
+
+# Server-side chat transcripts, so clients send a session id and only the
+# new message. Transcripts are append-only and include the AI tool-call
+# messages and ToolMessages produced during each turn.
+#
+# SESSION_STORE=redis (default when REDIS_URL is set) shares sessions across
+# workers; SESSION_STORE=memory keeps them in this process.
+SESSION_STORE = os.getenv("SESSION_STORE", "redis" if REDIS_URL else "memory")
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", str(7 * 86400)))
+# Oldest messages beyond this are discarded on append
+SESSION_MAX_MESSAGES = int(os.getenv("SESSION_MAX_MESSAGES", "500"))
+SESSION_MEMORY_MAX_SESSIONS = int(os.getenv("SESSION_MEMORY_MAX_SESSIONS", "10000"))
+
+
+def new_session_id() -> str:
+    return uuid.uuid4().hex
+
+
+def _drop_orphans(messages: List[BaseMessage]) -> List[BaseMessage]:
+    # Trimming can cut between a tool call and its results; a transcript
+    # must not start with ToolMessages.
+    start = 0
+    while start < len(messages) and isinstance(messages[start], ToolMessage):
+        start += 1
+    return messages[start:]
+
+
+class SessionStore(ABC):
+    """Interface: load the transcript, append new messages, delete."""
+
+    @abstractmethod
+    async def load(self, session_id: str) -> List[BaseMessage]:
+        ...
+
+    @abstractmethod
+    async def append(self, session_id: str, messages: List[BaseMessage]) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, session_id: str) -> None:
+        ...
+
+
+class InMemorySessionStore(SessionStore):
+    """Per-process store with LRU eviction and an idle TTL; for tests and single-worker setups."""
+
+    def __init__(self, max_sessions: int = SESSION_MEMORY_MAX_SESSIONS, ttl: float = SESSION_TTL_SECONDS):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions: "OrderedDict[str, List[dict]]" = OrderedDict()
+        self._touched = {}
+
+    def _get(self, session_id: str) -> Optional[List[dict]]:
+        stored = self._sessions.get(session_id)
+        if stored is None:
+            return None
+        if time.monotonic() - self._touched[session_id] > self.ttl:
+            del self._sessions[session_id]
+            del self._touched[session_id]
+            return None
+        return stored
+
+    async def load(self, session_id: str) -> List[BaseMessage]:
+        stored = self._get(session_id)
+        return _drop_orphans(messages_from_dict(stored)) if stored else []
+
+    async def append(self, session_id: str, messages: List[BaseMessage]) -> None:
+        stored = self._get(session_id) or []
+        stored.extend(messages_to_dict(messages))
+        del stored[:-SESSION_MAX_MESSAGES]
+        self._sessions[session_id] = stored
+        self._sessions.move_to_end(session_id)
+        self._touched[session_id] = time.monotonic()
+        while len(self._sessions) > self.max_sessions:
+            oldest, _ = self._sessions.popitem(last=False)
+            del self._touched[oldest]
+
+    async def delete(self, session_id: str) -> None:
+        self._sessions.pop(session_id, None)
+        self._touched.pop(session_id, None)
+
+
+class RedisSessionStore(SessionStore):
+    """One Redis list per session, one JSON message per item."""
+
+    def _key(self, session_id: str) -> str:
+        return f"session:{session_id}"
+
+    def _redis(self):
+        redis = get_redis()
+        if redis is None:
+            raise RuntimeError("SESSION_STORE=redis but Redis is not available")
+        return redis
+
+    async def load(self, session_id: str) -> List[BaseMessage]:
+        items = await self._redis().lrange(self._key(session_id), 0, -1)
+        return _drop_orphans(messages_from_dict([json.loads(item) for item in items]))
+
+    async def append(self, session_id: str, messages: List[BaseMessage]) -> None:
+        if not messages:
+            return
+        key = self._key(session_id)
+        pipe = self._redis().pipeline()
+        pipe.rpush(key, *[json.dumps(m) for m in messages_to_dict(messages)])
+        pipe.ltrim(key, -SESSION_MAX_MESSAGES, -1)
+        pipe.expire(key, SESSION_TTL_SECONDS)
+        await pipe.execute()
+
+    async def delete(self, session_id: str) -> None:
+        await self._redis().delete(self._key(session_id))
+
+
+_store: Optional[SessionStore] = None
+
+
+def get_session_store() -> SessionStore:
+    global _store
+    if _store is None:
+        _store = RedisSessionStore() if SESSION_STORE == "redis" else InMemorySessionStore()
+    return _store
+
+
+def set_session_store(store: SessionStore) -> None:
+    """Swap the backend, e.g. an InMemorySessionStore in tests."""
+    global _store
+    _store = store
@@ -0,0 +1,45 @@
+import os
+import threading
+from typing import Any, Optional
+from core.logger import get_logger
+
+# One Supabase client per process, shared by config_loader, the
+# orchestrator's agent catalog and anything else that reads agent_configs.
+# It is created on first use rather than at import time, so importing the
+# app (and answering /health) doesn't pay for the supabase package.
+SUPABASE_URL = os.environ.get("SUPABASE_URL", "http://localhost:8000") # Default to local Kong if not set
+SUPABASE_SERVICE_ROLE_KEY = os.environ.get("SUPABASE_SERVICE_ROLE_KEY", "")
+
+log = get_logger(__name__)
+
+_client: Optional[Any] = None
+_initialized = False
+_lock = threading.Lock()
+
+
+def get_supabase() -> Optional[Any]:
+    """
+    The shared client, or None if it couldn't be created (callers fall back
+    the same way they do when the DB is unreachable).
+    """
+    global _client, _initialized
+    if _initialized:
+        return _client
+    with _lock:
+        if not _initialized:
+            try:
+                from supabase import create_client
+                _client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+            except Exception as e:
+                log.warning("Failed to initialize Supabase client: %s", e)
+                _client = None
+            _initialized = True
+    return _client
+
+
+def set_supabase(client: Optional[Any]) -> None:
+    """Replace the shared client (tests, benchmarks)."""
+    global _client, _initialized
+    with _lock:
+        _client = client
+        _initialized = True
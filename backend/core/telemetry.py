@@ -0,0 +1,108 @@
+import os
+import asyncio
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+from core import metrics
+from core.logger import get_logger
+
+# Timing spans for the chat hot path.
+#
+# Every span is observed in stage_duration_seconds{stage,target}, where
+# stage is one of routing, config_fetch, toolset_build, llm_call,
+# tool_call, request, startup_warmup (plus voice_session_start,
+# voice_first_audio, voice_eou, voice_llm_ttft, voice_tts_ttfb and
+# voice_mouth_to_ear in the voice worker) and target names the agent,
+# model or tool. When
+# TRACING_OTLP_ENDPOINT is set (e.g. Phoenix at
+# http://phoenix:6006/v1/traces) and the OpenTelemetry SDK is installed,
+# the same spans are exported as traces.
+TRACING_OTLP_ENDPOINT = os.getenv("TRACING_OTLP_ENDPOINT", "")
+TRACING_SERVICE_NAME = os.getenv("TRACING_SERVICE_NAME", "omni-backend")
+
+log = get_logger(__name__)
+
+stage_duration = metrics.histogram(
+    "stage_duration_seconds", "Time spent per hot-path stage", ("stage", "target")
+)
+stage_errors = metrics.counter(
+    "stage_errors_total", "Hot-path stages that raised", ("stage", "target")
+)
+
+_tracer = None
+_otel_trace = None
+# Innermost open OTel span, so nested spans get the right parent
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+def configure_tracing() -> bool:
+    """Set up OTLP export if configured; returns True when traces are exported."""
+    global _tracer, _otel_trace
+    if not TRACING_OTLP_ENDPOINT or _tracer is not None:
+        return _tracer is not None
+    try:
+        from opentelemetry import trace
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        log.warning("TRACING_OTLP_ENDPOINT is set but the OpenTelemetry SDK is not installed")
+        return False
+
+    provider = TracerProvider(resource=Resource.create({"service.name": TRACING_SERVICE_NAME}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=TRACING_OTLP_ENDPOINT)))
+    _otel_trace = trace
+    _tracer = provider.get_tracer("omni-backend")
+    log.info("Exporting traces to %s", TRACING_OTLP_ENDPOINT)
+    return True
+
+
+def shutdown_tracing() -> None:
+    if _tracer is not None:
+        provider = _otel_trace.get_tracer_provider()
+        if hasattr(provider, "shutdown"):
+            provider.shutdown()
+
+
+def observe(stage: str, seconds: float, target: str = "") -> None:
+    """Record a duration measured by the caller (e.g. across a streamed response)."""
+    stage_duration.observe(seconds, stage=stage, target=target)
+
+
+@contextmanager
+def span(stage: str, target: str = "", **attributes: Any) -> Iterator[Optional[Any]]:
+    """
+    Time a block. Yields the OTel span (or None when tracing is off) so
+    callers can add attributes.
+    """
+    otel_span = None
+    token = None
+    if _tracer is not None:
+        parent = _current_span.get()
+        context = _otel_trace.set_span_in_context(parent) if parent is not None else None
+        attributes["target"] = target
+        otel_span = _tracer.start_span(stage, context=context, attributes=attributes)
+        token = _current_span.set(otel_span)
+
+    start = time.perf_counter()
+    try:
+        yield otel_span
+    except (GeneratorExit, asyncio.CancelledError):
+        raise
+    except BaseException as e:
+        stage_errors.inc(stage=stage, target=target)
+        if otel_span is not None:
+            otel_span.record_exception(e)
+            otel_span.set_status(_otel_trace.Status(_otel_trace.StatusCode.ERROR, str(e)))
+        raise
+    finally:
+        stage_duration.observe(time.perf_counter() - start, stage=stage, target=target)
+        if otel_span is not None:
+            otel_span.end()
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                # Closed from another context (e.g. an abandoned stream)
+                pass
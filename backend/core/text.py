@@ -0,0 +1,17 @@
+import re
+import unicodedata
+
+# Text normalization shared by the routing cache and the response cache.
+# Kept free of LLM and DB imports so either can use it cheaply.
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+def normalize_message(message: str) -> str:
+    """
+    Normalize a user message for cache lookups: case, unicode forms,
+    whitespace and trailing punctuation don't change which agent is picked
+    or which answer is reused.
+    """
+    text = unicodedata.normalize("NFKC", message).lower()
+    text = _WHITESPACE_RE.sub(" ", text).strip()
+    return text.rstrip(" .!?")
@@ -1,27 +1,41 @@
-from typing import List, Callable, Dict, Any
+from typing import List, Callable, Dict, Any, Optional
 from langchain_core.tools import StructuredTool
+from langchain_core.utils.function_calling import convert_to_openai_tool
 from pydantic import create_model
-import requests
 import json
+import os
+from core import http_client
+from core.cache import TTLCache
+from core.logger import get_logger
 from tools.search import web_search
-from tools.n8n_bridge import trigger_n8n
-from tools.scraper import smart_scrape
+from tools.n8n_bridge import n8n_job_status, trigger_n8n
+from tools.scraper import batch_scrape, smart_scrape
+
+log = get_logger(__name__)
 
 TOOL_MAP = {
     "web_search": web_search,
     "n8n_webhook": trigger_n8n,
-    "web_scraper": smart_scrape
+    "web_scraper": smart_scrape,
+    "web_scraper_batch": batch_scrape,
+    "n8n_job_status": n8n_job_status
+}
+
+# Tools that come along with another one, so the agent can use its results
+TOOL_COMPANIONS = {
+    "n8n_webhook": ["n8n_job_status"],
 }
 
 def get_agent_tools(tool_names: List[str]) -> List[Callable]:
     """
     Get a list of standard tool functions based on the provided tool names.
     """
-    tools = []
+    names = []
     for name in tool_names:
-        if name in TOOL_MAP:
-            tools.append(TOOL_MAP[name])
-    return tools
+        for tool_name in [name] + TOOL_COMPANIONS.get(name, []):
+            if tool_name in TOOL_MAP and tool_name not in names:
+                names.append(tool_name)
+    return [TOOL_MAP[name] for name in names]
 
 def create_dynamic_tool(tool_config: Dict[str, Any]) -> StructuredTool:
     """
@@ -71,20 +85,20 @@ def create_dynamic_tool(tool_config: Dict[str, Any]) -> StructuredTool:
     else:
         ArgsModel = create_model(f"{name}Args", **fields)
 
-    def tool_func(**kwargs):
+    async def tool_func(**kwargs):
         headers = {}
         if auth_header_name and auth_header_value:
             headers[auth_header_name] = auth_header_value
             
         try:
-            response = requests.post(webhook_url, json=kwargs, headers=headers)
+            response = await http_client.request("POST", webhook_url, json=kwargs, headers=headers)
             response.raise_for_status()
             return f"Tool '{name}' executed successfully. Response: {response.text}"
         except Exception as e:
             return f"Failed to execute tool '{name}': {str(e)}"
 
     return StructuredTool.from_function(
-        func=tool_func,
+        coroutine=tool_func,
         name=name,
         description=description,
         args_schema=ArgsModel
@@ -100,5 +114,43 @@ def get_custom_tools(custom_tools_config: List[Dict[str, Any]]) -> List[Structur
             tool = create_dynamic_tool(config)
             tools.append(tool)
         except Exception as e:
-            print(f"Error creating custom tool '{config.get('name')}': {e}")
+            log.error("Error creating custom tool '%s': %s", config.get("name"), e)
     return tools
+
+
+class CompiledToolset:
+    """
+    An agent's tools built once: the tool objects, a name -> tool index and
+    the OpenAI-format schemas ready to bind to the LLM.
+    """
+
+    def __init__(self, tools: List[Any]):
+        self.tools = tools
+        self.tools_by_name = {t.name: t for t in tools}
+        self.schemas = [convert_to_openai_tool(t) for t in tools]
+
+
+# Keyed on (slug, config_version), so an edited agent gets a fresh entry and
+# the old one ages out of the LRU.
+_toolset_cache = TTLCache(
+    maxsize=int(os.getenv("TOOLSET_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("TOOLSET_CACHE_TTL", "86400")),
+)
+
+
+def get_compiled_toolset(slug: str, agent_config: Dict[str, Any]) -> CompiledToolset:
+    """
+    Return the agent's compiled tool set, building it only on first use of
+    this config version.
+    """
+    key = (slug, agent_config.get("config_version"))
+    toolset: Optional[CompiledToolset] = _toolset_cache.get(key)
+    if toolset is None:
+        # Standard tools
+        standard_tools = get_agent_tools(agent_config.get("tools") or [])
+        # Custom tools
+        custom_tools = get_custom_tools(agent_config.get("custom_tools") or [])
+        toolset = CompiledToolset(standard_tools + custom_tools)
+        _toolset_cache.set(key, toolset)
+        log.debug("Compiled tools for %s: %s", slug, list(toolset.tools_by_name))
+    return toolset
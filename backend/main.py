@@ -1,15 +1,28 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import Body, FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import List, Optional, Dict
-import litellm
+from starlette.background import BackgroundTask
+from typing import Any, List, Optional, Dict
 import os
+import sys
+import asyncio
+import json
+import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from core.config_loader import get_agent_config, get_all_agents
+from core.config_loader import get_agent_config_async, get_all_agents_async
+from core import config_events, http_client, metrics, redis_client, telemetry
+from core.admission import DEFAULT_LANE, AdmissionRejected, admission
+from core.logger import get_logger
+from tools import n8n_jobs
 
 # Load environment variables
 load_dotenv()
 
+log = get_logger("main")
+
 app = FastAPI(title="Omni-Stack 5.0 Backend API")
 
 # CORS configuration for Caddy setup
@@ -25,8 +38,98 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Set OpenAI API key for LiteLLM
-litellm.api_key = os.getenv("OPENAI_API_KEY")
+# Startup mode. The chat path (LiteLLM, LangChain, Supabase, tools) is not
+# imported with this module, so /health answers as soon as uvicorn is up:
+#   background - import and warm it in a task right after startup (default)
+#   eager      - warm it before the server accepts requests
+#   lazy       - warm it when the first chat request needs it
+# Requests that need the chat path wait for the warmup in every mode.
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "background").lower()
+
+_warmup_task: Optional[asyncio.Future] = None
+_orchestrator = None
+_background_tasks = set()
+
+# Blocking work (sync Supabase client, sync tools) runs in the default executor.
+# Size it for concurrent chats rather than the CPU-based default of ~32 threads.
+BLOCKING_POOL_SIZE = int(os.getenv("BLOCKING_POOL_SIZE", "256"))
+
+# Models a request may choose with 'model' besides the agent's own
+# (comma-separated). Admission and the LLM registry keep state per model
+# name, so arbitrary names from clients are refused.
+CHAT_ALLOWED_MODELS = {m.strip() for m in os.getenv("CHAT_ALLOWED_MODELS", "").split(",") if m.strip()}
+
+@app.on_event("startup")
+async def configure_blocking_pool():
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(
+        ThreadPoolExecutor(max_workers=BLOCKING_POOL_SIZE, thread_name_prefix="blocking")
+    )
+    # Optional trace export (e.g. to Phoenix)
+    telemetry.configure_tracing()
+
+def get_orchestrator():
+    global _orchestrator
+    if _orchestrator is None:
+        from core.orchestrator import Orchestrator
+        _orchestrator = Orchestrator()
+    return _orchestrator
+
+def _import_chat_path() -> None:
+    import supabase  # noqa: F401
+    import core.chat_engine  # noqa: F401
+    import core.orchestrator  # noqa: F401
+    import core.session_store  # noqa: F401
+
+async def _warm_chat_path() -> None:
+    started = time.perf_counter()
+    # Imports run in a worker thread so the event loop keeps serving /health
+    await asyncio.to_thread(_import_chat_path)
+    from core import llm_registry
+    # Warm, shared HTTP session for all LiteLLM provider calls
+    llm_registry.configure_sessions()
+    get_orchestrator()
+    elapsed = time.perf_counter() - started
+    telemetry.observe("startup_warmup", elapsed, STARTUP_WARMUP)
+    log.info("Chat path warmed up in %.0f ms (%s)", elapsed * 1000, STARTUP_WARMUP)
+
+    if STARTUP_WARMUP != "eager":
+        # Push invalidation for cached agent configs; TTL expiry is the fallback.
+        # Not awaited: requests shouldn't wait for the realtime handshake.
+        task = asyncio.ensure_future(config_events.start_realtime_listener())
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+async def ensure_chat_path() -> None:
+    """Wait until the chat path is imported and warm, starting the warmup if needed."""
+    global _warmup_task
+    failed = (
+        _warmup_task is not None and _warmup_task.done()
+        and (_warmup_task.cancelled() or _warmup_task.exception() is not None)
+    )
+    if _warmup_task is None or failed:
+        _warmup_task = asyncio.ensure_future(_warm_chat_path())
+    await asyncio.shield(_warmup_task)
+
+@app.on_event("startup")
+async def warm_up():
+    global _warmup_task
+    if STARTUP_WARMUP == "eager":
+        await ensure_chat_path()
+        await config_events.start_realtime_listener()
+    elif STARTUP_WARMUP != "lazy":
+        _warmup_task = asyncio.ensure_future(_warm_chat_path())
+        # Failures surface (and are retried) in ensure_chat_path
+        _warmup_task.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+@app.on_event("shutdown")
+async def close_http_pool():
+    await http_client.aclose()
+    llm_registry = sys.modules.get("core.llm_registry")
+    if llm_registry is not None:
+        await llm_registry.aclose_sessions()
+    await redis_client.aclose()
+    telemetry.shutdown_tracing()
 
 # Request/Response models
 class Message(BaseModel):
@@ -34,12 +137,20 @@ class Message(BaseModel):
     content: str
 
 class ChatRequest(BaseModel):
-    messages: List[Message]
+    # Either the full history (stateless clients) ...
+    messages: Optional[List[Message]] = None
+    # ... or a server-side session plus only the new user message
+    session_id: Optional[str] = None
+    message: Optional[str] = None
     model: Optional[str] = None # Optional now, as agent config overrides it
     agent_slug: str = "general" # Default to general agent
+    conversation_id: Optional[str] = None # Lets background n8n results reach the next turn
+    priority: Optional[str] = None # Admission lane: voice | interactive | batch (or X-Request-Priority)
 
 class ChatResponse(BaseModel):
     response: str
+    session_id: Optional[str] = None
+    cached: bool = False # Served from the agent's response cache
 
 class HealthResponse(BaseModel):
     status: str
@@ -55,135 +166,223 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "ok"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus-format metrics"""
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
 @app.get("/api/agents", response_model=List[Agent])
 async def get_agents():
     """Fetch all available agents"""
-    agents = get_all_agents()
+    agents = await get_all_agents_async()
     return agents
 
-from langchain_community.chat_models import ChatLiteLLM
-from langchain_core.messages import HumanMessage, SystemMessage, ToolMessage, AIMessage
-from core.tool_factory import get_agent_tools, get_custom_tools
-from core.orchestrator import Orchestrator
-import json
+def _request_lane(request: ChatRequest, http_request: Request) -> str:
+    return request.priority or http_request.headers.get("X-Request-Priority") or DEFAULT_LANE
 
-# Initialize Orchestrator
-orchestrator = Orchestrator()
+def _unavailable(status_code: int, detail: str, retry_after: int) -> HTTPException:
+    return HTTPException(status_code=status_code, detail=detail, headers={"Retry-After": str(retry_after)})
 
-# ... (imports remain the same)
+def _is_rate_limit(e: Exception) -> bool:
+    # litellm is only loaded once the chat path is warm
+    litellm = sys.modules.get("litellm")
+    return litellm is not None and isinstance(e, litellm.RateLimitError)
+
+async def _prepare_run(request: ChatRequest, lane: str = DEFAULT_LANE):
+    """
+    Resolve the agent, wait for admission, then build the run.
+    Returns (run, ticket); the caller must release the ticket.
+    """
+    await ensure_chat_path()
+    from core import session_store
+    from core.chat_engine import AgentNotFoundError, history_from_dicts, prepare_chat_run, resolve_agent_slug
+    from langchain_core.messages import HumanMessage
+
+    if request.session_id:
+        if not request.message:
+            raise HTTPException(status_code=422, detail="'message' is required with 'session_id'")
+        history = await session_store.get_session_store().load(request.session_id)
+        history.append(HumanMessage(content=request.message))
+        last_user_message = request.message
+    elif request.messages is not None:
+        history_dicts = [m.model_dump() for m in request.messages]
+        history = history_from_dicts(history_dicts)
+        last_user_message = next((m["content"] for m in reversed(history_dicts) if m["role"] == "user"), "")
+    else:
+        raise HTTPException(status_code=422, detail="Send either 'messages' or 'session_id' with 'message'")
+
+    # Handle Auto-Pilot
+    request.agent_slug = await resolve_agent_slug(request.agent_slug, last_user_message, get_orchestrator())
+    log.debug("Final agent_slug: %s", request.agent_slug)
+
+    with telemetry.span("config_fetch", request.agent_slug):
+        agent_config = await get_agent_config_async(request.agent_slug)
+    if not agent_config:
+        raise HTTPException(status_code=404, detail=f"Agent '{request.agent_slug}' not found")
+    model_name = request.model or agent_config.get("model_name", "gpt-3.5-turbo")
+    if request.model and request.model != agent_config.get("model_name") and request.model not in CHAT_ALLOWED_MODELS:
+        raise HTTPException(status_code=400, detail=f"Model '{request.model}' is not allowed for this agent")
+
+    # Queue for an agent + model slot, or fail fast instead of piling onto the LLM
+    try:
+        ticket = await admission.acquire(request.agent_slug, model_name, agent_config, lane)
+    except AdmissionRejected as e:
+        raise _unavailable(e.status_code, e.detail, e.retry_after)
+
+    try:
+        run = await prepare_chat_run(
+            request.agent_slug, history, request.model, request.conversation_id or request.session_id, agent_config
+        )
+    except AgentNotFoundError as e:
+        ticket.release()
+        raise HTTPException(status_code=404, detail=str(e))
+    except BaseException:
+        ticket.release()
+        raise
+    return run, ticket
+
+async def _save_turn(request: ChatRequest, run) -> None:
+    # Append-only: the user message, tool calls, tool results and the answer
+    if request.session_id:
+        from core import session_store
+        await session_store.get_session_store().append(request.session_id, run.new_messages())
 
 @app.post("/api/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, http_request: Request):
     """
     Chat endpoint using LangChain + LiteLLM for unified LLM access with Tooling.
     """
     try:
-        print(f"DEBUG: Incoming request agent_slug: {request.agent_slug}")
-        # Handle Auto-Pilot
-        if request.agent_slug == "auto" or not request.agent_slug:
-            # Get the last user message
-            last_user_message = next((m.content for m in reversed(request.messages) if m.role == "user"), "")
-            print(f"DEBUG: Last user message: '{last_user_message}'")
-            
-            if last_user_message:
-                selected_slug = orchestrator.route_request(last_user_message)
-                print(f"🤖 Auto-Pilot routed request to: {selected_slug}")
-                request.agent_slug = selected_slug
-            else:
-                print("DEBUG: No user message found, defaulting to general")
-                request.agent_slug = "general"
-        
-        print(f"DEBUG: Final agent_slug: {request.agent_slug}")
+        with telemetry.span("request", "chat"):
+            run, ticket = await _prepare_run(request, _request_lane(request, http_request))
+            from core.chat_engine import run_react_loop
+            try:
+                # ReAct Loop (Execute Tools)
+                # All model and tool calls are awaited so a slow upstream only parks
+                # this coroutine instead of blocking the worker's event loop.
+                final_response = ""
+                cached = False
+                async for event in run_react_loop(run):
+                    if event["type"] == "done":
+                        final_response = event["response"]
+                        cached = event["cached"]
+            finally:
+                ticket.release()
 
-        # Get agent configuration
-        agent_config = get_agent_config(request.agent_slug)
-        
-        if not agent_config:
-            raise HTTPException(status_code=404, detail=f"Agent '{request.agent_slug}' not found")
+            await _save_turn(request, run)
+        return {"response": final_response, "session_id": request.session_id, "cached": cached}
 
-        # 1. Setup Tools
-        # Standard tools
-        tools_list = agent_config.get("tools", [])
-        standard_tools = get_agent_tools(tools_list)
-        
-        # Custom tools
-        custom_tools_config = agent_config.get("custom_tools", [])
-        custom_tools = get_custom_tools(custom_tools_config)
-        
-        # Combine all tools
-        tools = standard_tools + custom_tools
-        
-        print(f"DEBUG: Agent Config: {agent_config}")
-        print(f"DEBUG: Standard Tools: {[t.name for t in standard_tools]}")
-        print(f"DEBUG: Custom Tools: {[t.name for t in custom_tools]}")
-        
-        # 2. Setup LLM
-        model_name = request.model or agent_config.get("model_name", "gpt-3.5-turbo")
-        temperature = agent_config.get("temperature", 0.7)
-        
-        llm = ChatLiteLLM(
-            model=model_name,
-            temperature=temperature,
-            api_key=os.getenv("OPENAI_API_KEY")
-        )
-        
-        # Bind tools if available
-        if tools:
-            llm_with_tools = llm.bind_tools(tools)
-        else:
-            llm_with_tools = llm
-
-        # 3. Prepare Messages
-        system_prompt = agent_config.get("system_prompt", "You are a helpful AI assistant.")
-        messages = [SystemMessage(content=system_prompt)]
-        
-        # Convert request messages to LangChain format
-        for msg in request.messages:
-            if msg.role == "user":
-                messages.append(HumanMessage(content=msg.content))
-            elif msg.role == "assistant":
-                messages.append(AIMessage(content=msg.content))
-        
-        # 4. ReAct Loop (Execute Tools)
-        # First call to LLM
-        response = llm_with_tools.invoke(messages)
-        messages.append(response)
-
-        # Loop while the LLM wants to call tools
-        while response.tool_calls:
-            for tool_call in response.tool_calls:
-                # Find the matching tool function
-                selected_tool = next((t for t in tools if t.name == tool_call["name"]), None)
-                
-                if selected_tool:
-                    print(f"Executing tool: {tool_call['name']} with args: {tool_call['args']}")
-                    # Execute tool
-                    tool_result = selected_tool.invoke(tool_call["args"])
-                    
-                    # Append result to messages
-                    messages.append(ToolMessage(
-                        tool_call_id=tool_call["id"],
-                        name=tool_call["name"],
-                        content=str(tool_result)
-                    ))
-                else:
-                    # Handle missing tool
-                    messages.append(ToolMessage(
-                        tool_call_id=tool_call["id"],
-                        name=tool_call["name"],
-                        content=f"Error: Tool {tool_call['name']} not found."
-                    ))
-            
-            # Call LLM again with tool outputs
-            response = llm_with_tools.invoke(messages)
-            messages.append(response)
-
-        return {"response": response.content}
-        
+    except HTTPException:
+        raise
     except Exception as e:
+        if _is_rate_limit(e):
+            # Upstream quota, not a server fault: tell the client to back off
+            log.warning("LLM rate limited in chat endpoint: %s", e)
+            raise _unavailable(503, "LLM provider is rate limiting requests", 5)
         # Handle errors
-        print(f"Error in chat endpoint: {str(e)}")
+        log.exception("Error in chat endpoint: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _sse(event: Dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+@app.post("/api/chat/stream")
+async def chat_stream(request: ChatRequest, http_request: Request):
+    """
+    Streaming variant of /api/chat (Server-Sent Events).
+
+    Emits 'agent' once routing is resolved, 'token' for each model delta,
+    'tool_start' / 'tool_end' around every tool call, then 'done' (or 'error').
+    'budget_exhausted' is sent when a per-request budget stops the loop, and
+    'discard' tells the client to drop the tokens received since the last
+    non-token event (an answer cut off by the deadline, replaced by the next).
+    """
+    started = time.perf_counter()
+    try:
+        run, ticket = await _prepare_run(request, _request_lane(request, http_request))
+    except HTTPException:
+        raise
+    except Exception as e:
+        log.exception("Error in chat stream setup: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
+    from core.chat_engine import run_react_loop
+
+    async def event_stream():
+        yield _sse({"type": "agent", "agent_slug": run.agent_slug})
+        events = run_react_loop(run, stream=True)
+        try:
+            async for event in events:
+                # Starlette cancels this generator when the client goes away;
+                # the explicit check also covers servers that don't.
+                if await http_request.is_disconnected():
+                    log.info("Client disconnected, aborting stream for %s", run.agent_slug)
+                    break
+                if event["type"] == "done":
+                    ticket.release()
+                    await _save_turn(request, run)
+                yield _sse(event)
+        except Exception as e:
+            log.exception("Error in chat stream: %s", e)
+            yield _sse({"type": "error", "detail": str(e)})
+        finally:
+            ticket.release()
+            await events.aclose()
+            # Whole request including the streamed body
+            telemetry.observe("request", time.perf_counter() - started, "chat_stream")
+
+    # The generator's finally never runs if the client leaves before the
+    # first chunk; the background task releases the ticket in that case too
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(ticket.release),
+    )
+
+@app.post("/api/sessions")
+async def create_session():
+    """Start a server-side conversation; pass the id as session_id to /api/chat"""
+    from core import session_store
+    return {"session_id": session_store.new_session_id()}
+
+@app.get("/api/sessions/{session_id}")
+async def get_session(session_id: str):
+    """Full stored transcript, including tool calls and tool results"""
+    from core import session_store
+    from langchain_core.messages import messages_to_dict
+    messages = await session_store.get_session_store().load(session_id)
+    return {"session_id": session_id, "messages": messages_to_dict(messages)}
+
+@app.delete("/api/sessions/{session_id}")
+async def delete_session(session_id: str):
+    from core import session_store
+    await session_store.get_session_store().delete(session_id)
+    return {"status": "deleted"}
+
+@app.get("/api/n8n/jobs/{job_id}")
+async def get_n8n_job(job_id: str):
+    """Status and result of a background n8n workflow"""
+    job = await n8n_jobs.job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return job.public_dict()
+
+@app.post("/api/n8n/jobs/{job_id}/callback")
+async def n8n_job_callback(job_id: str, token: str, body: Any = Body(None)):
+    """
+    Completion callback for long-running n8n workflows. The workflow posts its
+    result to the `_callback_url` it received; `{"error": "..."}` marks a failure.
+    """
+    job = await n8n_jobs.job_store.get(job_id)
+    if job is None or not secrets.compare_digest(token, job.callback_token):
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+
+    if isinstance(body, dict) and body.get("error"):
+        await n8n_jobs.complete_job(job, error=str(body["error"]))
+    else:
+        result = body if isinstance(body, str) else json.dumps(body, default=str)
+        await n8n_jobs.complete_job(job, result=result)
+    return {"status": job.status}
 
 @app.get("/api/voice/token")
 async def get_voice_token(agent_slug: str = "general"):
@@ -220,7 +419,7 @@ async def get_voice_token(agent_slug: str = "general"):
         }
         
     except Exception as e:
-        print(f"Error generating voice token: {str(e)}")
+        log.error("Error generating voice token: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 if __name__ == "__main__":
@@ -1,5 +1,6 @@
 import asyncio
-from core.config_loader import get_all_agents, supabase
+from core.config_loader import get_all_agents
+from core.supabase_client import get_supabase
 
 async def test_db():
     print("Fetching agents...")
@@ -8,7 +9,7 @@ async def test_db():
     
     print("Inserting Pirate Bot...")
     try:
-        data = supabase.table("agent_configs").insert({
+        data = get_supabase().table("agent_configs").insert({
             "name": "Pirate Bot",
             "slug": "pirate",
             "system_prompt": "You are a pirate. Always speak like a pirate.",
@@ -0,0 +1,114 @@
+from html.parser import HTMLParser
+from typing import Iterable, List
+
+# Content of these elements is never text the reader sees
+SKIP_TAGS = {"script", "style", "noscript", "template", "svg"}
+
+# Tags that end the current line of text
+BLOCK_TAGS = {
+    "address", "article", "aside", "blockquote", "br", "dd", "div", "dl", "dt",
+    "figcaption", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header",
+    "hr", "li", "main", "nav", "ol", "p", "pre", "section", "table", "td", "th",
+    "title", "tr", "ul",
+}
+
+
+class StreamingTextExtractor(HTMLParser):
+    """
+    Incremental HTML -> text extractor with a character budget.
+
+    Feed it decoded chunks as they arrive. script/style content is dropped
+    while parsing, and lines are normalized the same way the BeautifulSoup
+    path does it: stripped, split on double spaces, blanks dropped. Once
+    max_chars characters of output exist, `done` is set and the caller
+    should stop reading the body.
+    """
+
+    def __init__(self, max_chars: int):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.done = False
+        self._skip_depth = 0
+        self._line: List[str] = []
+        self._line_length = 0
+        self._chunks: List[str] = []
+        self._length = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in BLOCK_TAGS:
+            self._flush_line()
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in BLOCK_TAGS:
+            self._flush_line()
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in BLOCK_TAGS:
+            self._flush_line()
+
+    def handle_data(self, data):
+        if self._skip_depth or self.done:
+            return
+        lines = data.split("\n")
+        self._append(lines[0])
+        for line in lines[1:]:
+            self._flush_line()
+            self._append(line)
+        # A long run of inline text is one line; don't buffer it past the budget
+        if self._length + self._line_length > self.max_chars:
+            self._flush_line()
+
+    def _append(self, text: str):
+        self._line.append(text)
+        self._line_length += len(text)
+
+    def _flush_line(self):
+        if not self._line:
+            return
+        line = "".join(self._line)
+        self._line = []
+        self._line_length = 0
+        for phrase in line.strip().split("  "):
+            phrase = phrase.strip()
+            if not phrase or self.done:
+                continue
+            # Keep only what fits; the rest of a long run is never used
+            phrase = phrase[:max(0, self.max_chars - self._length)]
+            if phrase:
+                self._chunks.append(phrase)
+            self._length += len(phrase) + 1
+            if self._length > self.max_chars:
+                self.done = True
+
+    def feed(self, data: str) -> bool:
+        """Parse a chunk; returns True once the budget is reached."""
+        if not self.done:
+            super().feed(data)
+        return self.done
+
+    def close(self):
+        if not self.done:
+            super().close()
+            self._flush_line()
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self._chunks)
+
+    @property
+    def truncated(self) -> bool:
+        return self.done
+
+
+def extract_text_streaming(chunks: Iterable[str], max_chars: int) -> StreamingTextExtractor:
+    """Run the extractor over an iterable of decoded chunks."""
+    extractor = StreamingTextExtractor(max_chars)
+    for chunk in chunks:
+        if extractor.feed(chunk):
+            break
+    extractor.close()
+    return extractor
@@ -1,24 +1,41 @@
-import requests
 from langchain_core.tools import tool
-import os
+from tools.n8n_jobs import N8N_SYNC_WAIT_SECONDS, dispatch, job_store
 
 @tool
-def trigger_n8n(webhook_path: str, payload: dict) -> str:
+async def trigger_n8n(webhook_path: str, payload: dict) -> str:
     """
     Trigger an n8n automation workflow via webhook.
-    
+
+    Short workflows return their response directly. Long-running ones return a
+    job id; check it with n8n_job_status, or wait for the result to be added
+    to the conversation when the workflow finishes.
+
     Args:
         webhook_path (str): The path of the webhook (e.g., "my-workflow").
                             Do NOT include the full URL, just the path.
         payload (dict): The JSON payload to send to the workflow.
     """
-    # Internal Docker DNS for n8n
-    n8n_host = "http://n8n:5678"
-    url = f"{n8n_host}/webhook/{webhook_path}"
-    
-    try:
-        response = requests.post(url, json=payload)
-        response.raise_for_status()
-        return f"Successfully triggered n8n workflow '{webhook_path}'. Response: {response.text}"
-    except requests.exceptions.RequestException as e:
-        return f"Failed to trigger n8n workflow: {str(e)}"
+    job = await dispatch(webhook_path, payload)
+
+    if job.status == "succeeded":
+        return f"Successfully triggered n8n workflow '{webhook_path}'. Response: {job.result}"
+    if job.status == "failed":
+        return f"Failed to trigger n8n workflow: {job.error}"
+    return (
+        f"n8n workflow '{webhook_path}' is still running after {N8N_SYNC_WAIT_SECONDS:g}s "
+        f"and continues in the background. Job id: {job.id}. "
+        "Tell the user it is in progress; its result will be added to the conversation when done."
+    )
+
+@tool
+async def n8n_job_status(job_id: str) -> str:
+    """
+    Check the status and result of an n8n workflow started by trigger_n8n.
+
+    Args:
+        job_id (str): The job id returned by trigger_n8n.
+    """
+    job = await job_store.get(job_id)
+    if job is None:
+        return f"No n8n job found with id '{job_id}'."
+    return job.summary()
@@ -0,0 +1,245 @@
+import os
+import asyncio
+import contextvars
+import json
+import secrets
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Set
+from core import http_client
+from core.logger import get_logger
+from core.redis_client import get_redis
+
+# Internal Docker DNS for n8n
+N8N_HOST = os.getenv("N8N_HOST", "http://n8n:5678")
+# Where n8n workflows can POST their final result (see /api/n8n/jobs/{id}/callback)
+N8N_CALLBACK_BASE_URL = os.getenv("N8N_CALLBACK_BASE_URL", "http://backend:8000")
+# How long trigger_n8n waits before handing back a job id instead of a result
+N8N_SYNC_WAIT_SECONDS = float(os.getenv("N8N_SYNC_WAIT_SECONDS", "5"))
+# Upper bound for the webhook HTTP call running in the background
+N8N_MAX_RUN_SECONDS = float(os.getenv("N8N_MAX_RUN_SECONDS", "600"))
+N8N_JOB_TTL_SECONDS = int(os.getenv("N8N_JOB_TTL_SECONDS", "86400"))
+N8N_RESULT_MAX_CHARS = int(os.getenv("N8N_RESULT_MAX_CHARS", "4000"))
+
+# n8n's reply when a webhook is set to "Respond: Immediately"
+N8N_STARTED_MESSAGE = "Workflow was started"
+
+log = get_logger(__name__)
+
+# Conversation the currently running chat turn belongs to (set by chat_engine)
+current_conversation_id: contextvars.ContextVar = contextvars.ContextVar("current_conversation_id", default=None)
+
+
+class N8nJob:
+    def __init__(
+        self,
+        webhook_path: str,
+        conversation_id: Optional[str] = None,
+        id: Optional[str] = None,
+        callback_token: Optional[str] = None,
+        status: str = "queued",
+        result: Optional[str] = None,
+        error: Optional[str] = None,
+        created_at: Optional[float] = None,
+        finished_at: Optional[float] = None,
+        delivered: bool = False,
+    ):
+        self.id = id or uuid.uuid4().hex
+        self.webhook_path = webhook_path
+        self.conversation_id = conversation_id
+        self.callback_token = callback_token or secrets.token_urlsafe(16)
+        self.status = status
+        self.result = result
+        self.error = error
+        self.created_at = created_at or time.time()
+        self.finished_at = finished_at
+        self.delivered = delivered
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    @property
+    def callback_url(self) -> str:
+        return f"{N8N_CALLBACK_BASE_URL}/api/n8n/jobs/{self.id}/callback?token={self.callback_token}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.__dict__)
+
+    def public_dict(self) -> Dict[str, Any]:
+        data = self.to_dict()
+        data.pop("callback_token", None)
+        return data
+
+    def summary(self) -> str:
+        if self.status == "succeeded":
+            return f"n8n workflow '{self.webhook_path}' (job {self.id}) finished. Response: {self.result}"
+        if self.status == "failed":
+            return f"n8n workflow '{self.webhook_path}' (job {self.id}) failed: {self.error}"
+        return f"n8n workflow '{self.webhook_path}' (job {self.id}) is still {self.status}."
+
+
+class JobStore:
+    """
+    Job state plus per-conversation queues of finished jobs awaiting delivery.
+
+    Kept in Redis when REDIS_URL is set, so the callback can land on a
+    different uvicorn worker than the one that dispatched the job;
+    in-process dicts otherwise.
+    """
+
+    def __init__(self):
+        self._jobs: Dict[str, N8nJob] = {}
+        self._pending: Dict[str, List[str]] = {}
+        self._completed: Set[str] = set()
+
+    def _prune(self) -> None:
+        cutoff = time.time() - N8N_JOB_TTL_SECONDS
+        for job_id in [j.id for j in self._jobs.values() if j.created_at < cutoff]:
+            del self._jobs[job_id]
+            self._completed.discard(job_id)
+
+    async def save(self, job: N8nJob) -> None:
+        if job.id not in self._jobs and len(self._jobs) >= 1000:
+            self._prune()
+        self._jobs[job.id] = job
+        redis = get_redis()
+        if redis is not None:
+            await redis.set(f"n8n:job:{job.id}", json.dumps(job.to_dict()), ex=N8N_JOB_TTL_SECONDS)
+
+    async def get(self, job_id: str) -> Optional[N8nJob]:
+        redis = get_redis()
+        if redis is not None:
+            raw = await redis.get(f"n8n:job:{job_id}")
+            return N8nJob(**json.loads(raw)) if raw else None
+        return self._jobs.get(job_id)
+
+    async def claim_completion(self, job_id: str) -> bool:
+        """
+        True for exactly one caller per job, even when the webhook response
+        and the callback land on different workers at the same time.
+        """
+        redis = get_redis()
+        if redis is not None:
+            claimed = await redis.set(f"n8n:job:{job_id}:completed", "1", nx=True, ex=N8N_JOB_TTL_SECONDS)
+            return bool(claimed)
+        if job_id in self._completed:
+            return False
+        self._completed.add(job_id)
+        return True
+
+    async def push_pending(self, job: N8nJob) -> None:
+        if not job.conversation_id:
+            return
+        redis = get_redis()
+        if redis is not None:
+            key = f"n8n:pending:{job.conversation_id}"
+            await redis.rpush(key, job.id)
+            await redis.expire(key, N8N_JOB_TTL_SECONDS)
+        else:
+            self._pending.setdefault(job.conversation_id, []).append(job.id)
+
+    async def pop_pending(self, conversation_id: str) -> List[N8nJob]:
+        redis = get_redis()
+        if redis is not None:
+            key = f"n8n:pending:{conversation_id}"
+            pipe = redis.pipeline()
+            pipe.lrange(key, 0, -1)
+            pipe.delete(key)
+            job_ids, _ = await pipe.execute()
+            job_ids = [j.decode() if isinstance(j, bytes) else j for j in job_ids]
+        else:
+            job_ids = self._pending.pop(conversation_id, [])
+
+        jobs = []
+        for job_id in job_ids:
+            job = await self.get(job_id)
+            if job is not None and not job.delivered:
+                job.delivered = True
+                await self.save(job)
+                jobs.append(job)
+        return jobs
+
+
+job_store = JobStore()
+_running: Dict[str, asyncio.Task] = {}
+
+
+def _truncate(text: str) -> str:
+    if len(text) > N8N_RESULT_MAX_CHARS:
+        return text[:N8N_RESULT_MAX_CHARS] + "...(truncated)"
+    return text
+
+
+async def complete_job(job: N8nJob, result: Optional[str] = None, error: Optional[str] = None) -> None:
+    """
+    Mark a job finished (from the webhook response or the n8n callback) and
+    queue it for delivery into its conversation. Only the first completion counts.
+    """
+    # `job` may be a stale copy (in Redis mode every get() returns a new
+    # object), so the claim, not job.finished, decides who completes it
+    if job.finished or not await job_store.claim_completion(job.id):
+        return
+    job.status = "failed" if error is not None else "succeeded"
+    job.result = _truncate(result) if result is not None else None
+    job.error = error
+    job.finished_at = time.time()
+    await job_store.save(job)
+    await job_store.push_pending(job)
+
+
+async def _run_webhook(job: N8nJob, payload: Dict[str, Any]) -> None:
+    url = f"{N8N_HOST}/webhook/{job.webhook_path}"
+    body = dict(payload)
+    # Workflows that outlive the HTTP call can report back here
+    body.setdefault("_job_id", job.id)
+    body.setdefault("_callback_url", job.callback_url)
+
+    try:
+        job.status = "running"
+        await job_store.save(job)
+        # Can be held for up to N8N_MAX_RUN_SECONDS, so it must not take one of
+        # the n8n host's shared slots; the connection pool still bounds it
+        response = await http_client.request(
+            "POST", url, json=body, timeout=N8N_MAX_RUN_SECONDS, host_limited=False
+        )
+        response.raise_for_status()
+        if N8N_STARTED_MESSAGE in response.text:
+            # Queued in n8n; the result arrives through the callback
+            return
+        await complete_job(job, result=response.text)
+    except Exception as e:
+        # Anything else (bad N8N_HOST, Redis down...) would leave the job
+        # "running" forever, with nobody left to finish it
+        try:
+            await complete_job(job, error=str(e) or type(e).__name__)
+        except Exception as store_error:
+            log.error("Could not record failure of n8n job %s: %s", job.id, store_error)
+    finally:
+        _running.pop(job.id, None)
+
+
+async def dispatch(webhook_path: str, payload: Dict[str, Any], wait: float = N8N_SYNC_WAIT_SECONDS) -> N8nJob:
+    """
+    Start a workflow in the background and wait up to `wait` seconds for it.
+    Short workflows come back finished; long ones return a running job.
+    """
+    job = N8nJob(webhook_path, conversation_id=current_conversation_id.get())
+    await job_store.save(job)
+
+    task = asyncio.ensure_future(_run_webhook(job, payload))
+    _running[job.id] = task
+    await asyncio.wait({task}, timeout=wait)
+
+    if job.finished:
+        # Answered inline, so it must not be delivered again later
+        job.delivered = True
+        await job_store.save(job)
+    return job
+
+
+async def collect_finished_jobs(conversation_id: Optional[str]) -> List[N8nJob]:
+    """Finished background jobs for this conversation not yet shown to the model."""
+    if not conversation_id:
+        return []
+    return await job_store.pop_pending(conversation_id)
@@ -0,0 +1,137 @@
+import os
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from core import metrics
+from core.logger import get_logger
+from core.redis_client import get_redis
+
+# Entries younger than SCRAPE_CACHE_FRESH_SECONDS are served without touching
+# the network; older ones are revalidated with a conditional GET.
+SCRAPE_CACHE_FRESH_SECONDS = float(os.getenv("SCRAPE_CACHE_FRESH_SECONDS", "60"))
+SCRAPE_CACHE_MAX_BYTES = int(os.getenv("SCRAPE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+SCRAPE_CACHE_REDIS_TTL = int(os.getenv("SCRAPE_CACHE_REDIS_TTL", "86400"))
+
+log = get_logger(__name__)
+
+_TRACKING_PARAMS = {"fbclid", "gclid", "mc_cid", "mc_eid", "ref_src"}
+
+scrape_cache_requests = metrics.counter(
+    "scrape_cache_requests_total", "web_scraper cache outcomes", ("result",)
+)
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form of a URL for cache keys: lower-case scheme and host,
+    no default port, no fragment, no tracking parameters, sorted query.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    port = parts.port
+    if port and not ((scheme == "http" and port == 80) or (scheme == "https" and port == 443)):
+        host = f"{host}:{port}"
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.startswith("utm_") and k not in _TRACKING_PARAMS
+    )
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query), ""))
+
+
+class ScrapeEntry:
+    def __init__(self, text: str, truncated: bool, etag: Optional[str], last_modified: Optional[str], fetched_at: float):
+        self.text = text
+        self.truncated = truncated
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+
+    @property
+    def size(self) -> int:
+        return len(self.text.encode("utf-8"))
+
+    @property
+    def is_fresh(self) -> bool:
+        return time.time() - self.fetched_at < SCRAPE_CACHE_FRESH_SECONDS
+
+    def validators(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def to_json(self) -> str:
+        return json.dumps(self.__dict__)
+
+    @classmethod
+    def from_json(cls, raw) -> "ScrapeEntry":
+        return cls(**json.loads(raw))
+
+
+class ScrapeCache:
+    """
+    Two-tier cache of extracted page text, keyed on the normalized URL.
+
+    Tier 1 is an in-process LRU bounded by total bytes. Tier 2 is Redis,
+    when REDIS_URL is set, so every uvicorn worker shares the same entries.
+    """
+
+    def __init__(self, max_bytes: int = SCRAPE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, ScrapeEntry]" = OrderedDict()
+        self._bytes = 0
+
+    @staticmethod
+    def _redis_key(key: str) -> str:
+        return "scrape:" + hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    def _put_local(self, key: str, entry: ScrapeEntry) -> None:
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old.size
+        if entry.size > self.max_bytes:
+            return
+        self._entries[key] = entry
+        self._bytes += entry.size
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+
+    async def get(self, key: str) -> Optional[ScrapeEntry]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry
+
+        redis = get_redis()
+        if redis is None:
+            return None
+        try:
+            raw = await redis.get(self._redis_key(key))
+        except Exception as e:
+            log.warning("Scrape cache Redis read failed: %s", e)
+            return None
+        if raw is None:
+            return None
+        entry = ScrapeEntry.from_json(raw)
+        self._put_local(key, entry)
+        return entry
+
+    async def put(self, key: str, entry: ScrapeEntry) -> None:
+        self._put_local(key, entry)
+        redis = get_redis()
+        if redis is None:
+            return
+        try:
+            await redis.set(self._redis_key(key), entry.to_json(), ex=SCRAPE_CACHE_REDIS_TTL)
+        except Exception as e:
+            log.warning("Scrape cache Redis write failed: %s", e)
+
+
+scrape_cache = ScrapeCache()
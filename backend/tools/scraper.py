@@ -1,44 +1,232 @@
-import requests
-from bs4 import BeautifulSoup
+import asyncio
+import codecs
+import os
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
 from langchain_core.tools import tool
+from core import http_client
+from tools.html_extract import StreamingTextExtractor
+from tools.scrape_cache import ScrapeEntry, normalize_url, scrape_cache, scrape_cache_requests
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+MAX_CHARS = int(os.getenv("SCRAPER_MAX_CHARS", "8000"))
+
+# "stream": read the body in chunks and stop at the character budget (default)
+# "soup":   download everything and parse with BeautifulSoup
+EXTRACTION_MODE = os.getenv("SCRAPER_EXTRACTION_MODE", "stream")
+# Hard cap on bytes read in stream mode, for pages that are mostly markup/scripts
+MAX_BYTES = int(os.getenv("SCRAPER_MAX_BYTES", str(5 * 1024 * 1024)))
+CHUNK_SIZE = 16 * 1024
+
+# web_scraper_batch: shared output budget, URL cap and per-host politeness
+BATCH_MAX_CHARS = int(os.getenv("SCRAPER_BATCH_MAX_CHARS", "16000"))
+BATCH_MAX_URLS = int(os.getenv("SCRAPER_BATCH_MAX_URLS", "10"))
+PER_HOST_CONCURRENCY = int(os.getenv("SCRAPER_PER_HOST_CONCURRENCY", "2"))
+PER_HOST_DELAY = float(os.getenv("SCRAPER_PER_HOST_DELAY", "0.25"))
+
+ALLOWED_CONTENT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+
+class UnsupportedContentType(Exception):
+    pass
+
+def check_content_type(content_type: str) -> None:
+    """Reject non-HTML bodies (PDFs, images, archives...) before downloading them."""
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type and media_type not in ALLOWED_CONTENT_TYPES:
+        raise UnsupportedContentType(f"Unsupported content type '{media_type}'")
+
+def extract_text(html: str) -> str:
+    """
+    Extract readable text from an HTML document.
+    """
+    from bs4 import BeautifulSoup  # only the "soup" extractor needs it
+
+    soup = BeautifulSoup(html, 'html.parser')
+
+    # Remove script and style elements
+    for script in soup(["script", "style"]):
+        script.decompose()
+
+    # Get text
+    text = soup.get_text()
+
+    # Break into lines and remove leading/trailing space on each
+    lines = (line.strip() for line in text.splitlines())
+    # Break multi-headlines into a line each
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    # Drop blank lines
+    return '\n'.join(chunk for chunk in chunks if chunk)
+
+async def _download_streaming(url: str, headers: dict, cached: Optional[ScrapeEntry] = None):
+    """
+    Fetch and extract incrementally, stopping once MAX_CHARS of text exist.
+    Returns None on 304, otherwise the new ScrapeEntry.
+    """
+    async with http_client.stream("GET", url, headers=headers, timeout=10) as response:
+        if cached is not None and response.status_code == 304:
+            return None
+        response.raise_for_status()
+        check_content_type(response.headers.get("Content-Type", ""))
+
+        decoder = codecs.getincrementaldecoder(response.charset_encoding or "utf-8")(errors="replace")
+        extractor = StreamingTextExtractor(MAX_CHARS)
+        received = 0
+        async for chunk in response.aiter_bytes(CHUNK_SIZE):
+            received += len(chunk)
+            if extractor.feed(decoder.decode(chunk)) or received >= MAX_BYTES:
+                break
+        else:
+            # Bytes of a multi-byte character cut off at the end of the body
+            extractor.feed(decoder.decode(b"", final=True))
+        extractor.close()
+
+        entry = ScrapeEntry(
+            text=extractor.text[:MAX_CHARS],
+            truncated=extractor.truncated or received >= MAX_BYTES,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            fetched_at=time.time(),
+        )
+        return entry
+
+async def _download_soup(url: str, headers: dict, cached: Optional[ScrapeEntry] = None):
+    response = await http_client.request("GET", url, headers=headers, timeout=10)
+    if cached is not None and response.status_code == 304:
+        return None
+    response.raise_for_status()
+    check_content_type(response.headers.get("Content-Type", ""))
+
+    # Parsing is CPU-bound; keep it off the event loop
+    text = await asyncio.to_thread(extract_text, response.text)
+    return ScrapeEntry(
+        text=text[:MAX_CHARS],
+        truncated=len(text) > MAX_CHARS,
+        etag=response.headers.get("ETag"),
+        last_modified=response.headers.get("Last-Modified"),
+        fetched_at=time.time(),
+    )
+
+async def fetch_page(url: str) -> ScrapeEntry:
+    """
+    Return the extracted text of a page, from cache when possible.
+
+    Fresh entries are served directly. Stale ones are revalidated with a
+    conditional GET, and a 304 reuses the cached text without parsing.
+    """
+    key = normalize_url(url)
+    cached = await scrape_cache.get(key)
+    if cached is not None and cached.is_fresh:
+        scrape_cache_requests.inc(result="fresh")
+        return cached
+
+    headers = dict(HEADERS)
+    if cached is not None:
+        headers.update(cached.validators())
+
+    download = _download_soup if EXTRACTION_MODE == "soup" else _download_streaming
+    entry = await download(url, headers, cached)
+    if entry is None:
+        scrape_cache_requests.inc(result="revalidated")
+        cached.fetched_at = time.time()
+        await scrape_cache.put(key, cached)
+        return cached
+
+    scrape_cache_requests.inc(result="miss")
+    await scrape_cache.put(key, entry)
+    return entry
+
+def format_page(entry: ScrapeEntry, max_chars: int = MAX_CHARS) -> str:
+    text = entry.text
+
+    # Basic truncation if too long (to fit in context)
+    if len(text) > max_chars or entry.truncated:
+        text = text[:max_chars] + "...(content truncated)"
+
+    if len(text) < 500:
+         return f"Scraped content is very short ({len(text)} chars). The page might be dynamic (JS-heavy). Content: {text}"
+
+    return text
 
 @tool
-def smart_scrape(url: str) -> str:
+async def smart_scrape(url: str) -> str:
     """
     Scrape text content from a webpage.
     Useful for reading articles, documentation, or extracting specific information from a URL.
     """
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Remove script and style elements
-        for script in soup(["script", "style"]):
-            script.decompose()
-            
-        # Get text
-        text = soup.get_text()
-        
-        # Break into lines and remove leading/trailing space on each
-        lines = (line.strip() for line in text.splitlines())
-        # Break multi-headlines into a line each
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        # Drop blank lines
-        text = '\n'.join(chunk for chunk in chunks if chunk)
-        
-        # Basic truncation if too long (to fit in context)
-        if len(text) > 8000:
-            text = text[:8000] + "...(content truncated)"
-            
-        if len(text) < 500:
-             return f"Scraped content is very short ({len(text)} chars). The page might be dynamic (JS-heavy). Content: {text}"
-
-        return text
-        
+        return format_page(await fetch_page(url))
     except Exception as e:
         return f"Failed to scrape URL: {str(e)}"
+
+class HostPoliteness:
+    """
+    Per-host limits for one batch: at most PER_HOST_CONCURRENCY requests in
+    flight and PER_HOST_DELAY seconds between request starts to the same host.
+    """
+
+    def __init__(self):
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._next_start: Dict[str, float] = {}
+
+    async def fetch(self, url: str) -> ScrapeEntry:
+        host = urlsplit(url).netloc.lower()
+        semaphore = self._semaphores.setdefault(host, asyncio.Semaphore(PER_HOST_CONCURRENCY))
+        async with semaphore:
+            now = time.monotonic()
+            start_at = max(now, self._next_start.get(host, now))
+            self._next_start[host] = start_at + PER_HOST_DELAY
+            if start_at > now:
+                await asyncio.sleep(start_at - now)
+            return await fetch_page(url)
+
+def split_budget(lengths: List[int], budget: int) -> List[int]:
+    """
+    Share a character budget across pages: short pages keep their full text
+    and whatever they don't use is redistributed to the longer ones.
+    """
+    allocation = [0] * len(lengths)
+    remaining = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    while remaining:
+        share = budget // len(remaining)
+        index = remaining.pop(0)
+        allocation[index] = min(lengths[index], share)
+        budget -= allocation[index]
+    return allocation
+
+@tool
+async def batch_scrape(urls: List[str]) -> str:
+    """
+    Scrape several webpages at once and return their text in one result.
+    Prefer this over calling web_scraper repeatedly when you need more than one page.
+    """
+    # De-duplicate while keeping the model's order
+    unique_urls = list(dict.fromkeys(u.strip() for u in urls if u and u.strip()))
+    skipped = unique_urls[BATCH_MAX_URLS:]
+    unique_urls = unique_urls[:BATCH_MAX_URLS]
+    if not unique_urls:
+        return "No URLs given."
+
+    politeness = HostPoliteness()
+    results = await asyncio.gather(
+        *(politeness.fetch(url) for url in unique_urls), return_exceptions=True
+    )
+
+    lengths = [len(r.text) if isinstance(r, ScrapeEntry) else 0 for r in results]
+    allocation = split_budget(lengths, BATCH_MAX_CHARS)
+
+    sections = []
+    for url, result, chars in zip(unique_urls, results, allocation):
+        if isinstance(result, ScrapeEntry):
+            text = result.text[:chars]
+            if chars < len(result.text) or result.truncated:
+                text += "...(content truncated)"
+        else:
+            text = f"Failed to scrape URL: {str(result)}"
+        sections.append(f"### {url}\n{text}")
+    if skipped:
+        sections.append(f"Skipped (batch limit {BATCH_MAX_URLS}): " + ", ".join(skipped))
+    return "\n\n".join(sections)
@@ -1,12 +1,130 @@
-from langchain_community.utilities import SearxSearchWrapper
+import os
+import hashlib
+import json
+import re
+import unicodedata
+from typing import Dict, List, Optional
 from langchain_core.tools import tool
+from core import metrics
+from core.cache import TTLCache
+from core.logger import get_logger
+from core.redis_client import get_redis
+from tools.scrape_cache import normalize_url
+
+log = get_logger(__name__)
+
+# Hardcoded to internal docker DNS for SearXNG by default
+SEARX_HOST = os.getenv("SEARX_HOST", "http://searxng:8080")
+SEARCH_NUM_RESULTS = int(os.getenv("SEARCH_NUM_RESULTS", "8"))
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "900"))
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "2000"))
+
+search_cache_requests = metrics.counter(
+    "search_cache_requests_total", "web_search cache outcomes", ("result",)
+)
+
+# In-process tier; also coalesces identical in-flight queries into one call
+_search_cache = TTLCache(
+    maxsize=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL, negative_ttl=0, is_negative=lambda results: not results
+)
+_search = None
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def get_search_wrapper():
+    global _search
+    if _search is None:
+        # langchain_community is slow to import; load it on first search
+        from langchain_community.utilities import SearxSearchWrapper
+        _search = SearxSearchWrapper(searx_host=SEARX_HOST)
+    return _search
+
+
+def normalize_query(query: str) -> str:
+    text = unicodedata.normalize("NFKC", query).lower()
+    text = _WHITESPACE_RE.sub(" ", text)
+    # Quotes are kept: "exact phrase" is a different search from exact phrase
+    return text.strip(" .?!")
+
+
+def dedupe_results(results: List[Dict]) -> List[Dict]:
+    """Drop results that point at the same page or repeat the same snippet."""
+    seen_links = set()
+    seen_snippets = set()
+    unique = []
+    for result in results:
+        link = result.get("link")
+        if not link:
+            continue
+        link_key = normalize_url(link)
+        snippet_key = normalize_query(result.get("snippet") or "")
+        if link_key in seen_links or (snippet_key and snippet_key in seen_snippets):
+            continue
+        seen_links.add(link_key)
+        if snippet_key:
+            seen_snippets.add(snippet_key)
+        unique.append(result)
+    return unique
+
+
+async def _fetch_results(query: str, engines: List[str], categories: str, cache_key: str) -> List[Dict]:
+    redis = get_redis()
+    redis_key = "search:" + hashlib.sha1(cache_key.encode("utf-8")).hexdigest()
+    if redis is not None:
+        try:
+            raw = await redis.get(redis_key)
+            if raw is not None:
+                search_cache_requests.inc(result="shared_hit")
+                return json.loads(raw)
+        except Exception as e:
+            log.warning("Search cache Redis read failed: %s", e)
+
+    search_cache_requests.inc(result="miss")
+    kwargs = {"categories": categories} if categories else {}
+    results = await get_search_wrapper().aresults(
+        query, num_results=SEARCH_NUM_RESULTS * 2, engines=engines or None, **kwargs
+    )
+    results = dedupe_results(results)[:SEARCH_NUM_RESULTS]
+
+    if redis is not None and results:
+        try:
+            await redis.set(redis_key, json.dumps(results), ex=int(SEARCH_CACHE_TTL))
+        except Exception as e:
+            log.warning("Search cache Redis write failed: %s", e)
+    return results
+
+
+async def cached_search(query: str, engines: Optional[List[str]] = None, categories: str = "") -> List[Dict]:
+    """
+    Search SearXNG through the cache. Keyed on the normalized query plus
+    engine parameters; empty result sets are not cached. The query is sent
+    upstream as the user wrote it.
+    """
+    engines = sorted(engines or [])
+    normalized = normalize_query(query)
+    cache_key = json.dumps([normalized, engines, categories, SEARCH_NUM_RESULTS])
+    if cache_key in _search_cache:
+        search_cache_requests.inc(result="hit")
+    results = await _search_cache.get_or_load(
+        cache_key, lambda: _fetch_results(query.strip(), engines, categories, cache_key)
+    )
+    return results or []
+
+
+def format_results(results: List[Dict]) -> str:
+    if not results:
+        return "No good Search Result was found"
+    lines = []
+    for i, result in enumerate(results, 1):
+        lines.append(f"{i}. {result.get('title', '')}\n{result['link']}\n{result.get('snippet', '')}")
+    return "\n\n".join(lines)
+
 
 @tool
-def web_search(query: str) -> str:
+async def web_search(query: str) -> str:
     """
     Search the web for information using SearXNG.
     Useful for finding up-to-date information, news, or facts.
     """
-    # Hardcoded to internal docker DNS for SearXNG
-    search = SearxSearchWrapper(searx_host="http://searxng:8080")
-    return search.run(query)
+    return format_results(await cached_search(query))
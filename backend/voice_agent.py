@@ -6,96 +6,305 @@ Handles real-time voice conversations with AI agents.
 
 import asyncio
 import os
+import time
+from typing import Any, Dict, List, Optional
 from dotenv import load_dotenv
 from livekit import agents
-from livekit.agents import AutoSubscribe, JobContext, WorkerOptions, cli
-from livekit.agents.llm import ChatContext, ChatMessage
+from livekit.agents import AutoSubscribe, JobContext, JobProcess, WorkerOptions, cli
+from livekit.agents import function_tool, tokenize, tts
+from livekit.agents import metrics as lk_metrics
 
 # --- LiveKit v1.0+ IMPORTS ---
 from livekit.agents import Agent, AgentSession
 from livekit.plugins import openai, deepgram, silero
 
 # Import your config loader to fetch the system prompt
-from core.config_loader import get_agent_config
+from core import config_loader, telemetry
+from core.config_loader import get_agent_config_async
+from core.logger import get_logger
 
 load_dotenv()
 
+log = get_logger("voice_agent")
+
+# How often a worker process re-reads all agent configs in the background,
+# so even a long-idle process answers its first call from the cache
+VOICE_CONFIG_REFRESH_SECONDS = float(os.getenv("VOICE_CONFIG_REFRESH_SECONDS", "240"))
+
+DEFAULT_SYSTEM_PROMPT = "You are a helpful assistant."
+
+# Used when an agent has no model_name, or its provider can't be served here
+VOICE_FALLBACK_MODEL = os.getenv("VOICE_FALLBACK_MODEL", "gpt-4o-mini")
+# For agents without tts_voice
+VOICE_DEFAULT_TTS_VOICE = os.getenv("VOICE_DEFAULT_TTS_VOICE", "alloy")
+# Shortest text handed to TTS as one piece: LLM output is spoken sentence by
+# sentence, and a short first sentence starts playback sooner
+VOICE_MIN_SENTENCE_CHARS = int(os.getenv("VOICE_MIN_SENTENCE_CHARS", "20"))
+OLLAMA_API_BASE = os.getenv("OLLAMA_API_BASE", "http://localhost:11434")
+
+_refresher_task: Optional[asyncio.Task] = None
+
+
+async def _refresh_configs_forever():
+    while True:
+        await asyncio.sleep(VOICE_CONFIG_REFRESH_SECONDS)
+        try:
+            await config_loader.preload_agent_configs_async()
+        except Exception as e:
+            log.warning("Agent config refresh failed: %s", e)
+
+
+def _start_config_refresher():
+    """
+    Keep the config cache warm from the job process's event loop. The cache
+    is not thread-safe, so the refresh must not run in a thread of its own;
+    only the DB query is handed to a worker thread.
+    """
+    global _refresher_task
+    if _refresher_task is None or _refresher_task.done():
+        _refresher_task = asyncio.ensure_future(_refresh_configs_forever())
+
+
+def prewarm(proc: JobProcess):
+    """
+    Runs once per worker process, before it is handed any job. Everything
+    loaded here is shared by the jobs the process runs instead of being
+    rebuilt on every room join.
+    """
+    start = time.perf_counter()
+    telemetry.configure_tracing()
+
+    # The tool path (LangChain, LiteLLM, tools) isn't imported with this
+    # module, so the worker registers quickly; job processes load it here
+    import core.chat_engine  # noqa: F401
+    import core.tool_factory  # noqa: F401
+
+    # Silero VAD is the slowest piece to load (ONNX model)
+    proc.userdata["vad"] = silero.VAD.load()
+    # STT does not depend on the agent, so one client serves every call
+    proc.userdata["stt"] = deepgram.STT()
+
+    loaded = config_loader.preload_agent_configs()
+
+    log.info("Prewarmed voice worker in %.0f ms (%d agent configs cached)", (time.perf_counter() - start) * 1000, loaded)
+
+
+def _slug_from_room(room_name: str) -> Optional[str]:
+    # Room name format: chat-{agent_slug}
+    if room_name.startswith("chat-") and len(room_name) > len("chat-"):
+        return room_name[len("chat-"):]
+    return None
+
+
+async def _load_config(agent_slug: str) -> dict:
+    # Served from the prewarmed cache; a miss runs the query off the event loop
+    with telemetry.span("config_fetch", agent_slug):
+        try:
+            config = await get_agent_config_async(agent_slug)
+        except Exception as e:
+            log.warning("Could not load config for %s, using default. Error: %s", agent_slug, e)
+            config = None
+    return config or {"name": "AI Assistant", "system_prompt": DEFAULT_SYSTEM_PROMPT}
+
+
+def _build_llm(config: Dict[str, Any]):
+    """The agent's own model and temperature, on the matching LiveKit plugin."""
+    provider = (config.get("model_provider") or "openai").lower()
+    model = config.get("model_name") or VOICE_FALLBACK_MODEL
+    # LiteLLM-style "provider/model" names win over model_provider
+    prefix, _, rest = model.partition("/")
+    if rest:
+        provider, model = prefix.lower(), rest
+
+    temperature = config.get("temperature")
+    kwargs: Dict[str, Any] = {"temperature": 0.7 if temperature is None else temperature}
+    if config.get("model_api_key"):
+        kwargs["api_key"] = config["model_api_key"]
+
+    if provider == "ollama":
+        kwargs.pop("api_key", None)
+        return openai.LLM.with_ollama(model=model, base_url=f"{OLLAMA_API_BASE.rstrip('/')}/v1", **kwargs)
+    if provider == "anthropic":
+        try:
+            from livekit.plugins import anthropic
+        except ImportError:
+            log.warning("livekit-plugins-anthropic is not installed; voice falls back to %s", VOICE_FALLBACK_MODEL)
+            kwargs.pop("api_key", None)
+            return openai.LLM(model=VOICE_FALLBACK_MODEL, **kwargs)
+        return anthropic.LLM(model=model, **kwargs)
+    if provider == "openai":
+        return openai.LLM(model=model, **kwargs)
+
+    # The agent's key belongs to its own provider and must not go to OpenAI
+    log.warning("Voice has no %s support; falling back to %s", provider, VOICE_FALLBACK_MODEL)
+    kwargs.pop("api_key", None)
+    return openai.LLM(model=VOICE_FALLBACK_MODEL, **kwargs)
+
+
+def _build_tts(config: Dict[str, Any]) -> tts.TTS:
+    """
+    The agent's TTS voice behind a sentence tokenizer, so the first sentence
+    of a reply is synthesized while the LLM is still writing the rest.
+    """
+    return tts.StreamAdapter(
+        tts=openai.TTS(voice=config.get("tts_voice") or VOICE_DEFAULT_TTS_VOICE),
+        sentence_tokenizer=tokenize.basic.SentenceTokenizer(min_sentence_len=VOICE_MIN_SENTENCE_CHARS),
+    )
+
+
+def _voice_tool(tool, schema: Dict[str, Any], timeout: float, budget):
+    """Wrap a tool_factory tool as a LiveKit function tool with the same schema."""
+    from core.context_budget import truncate_tool_result
+
+    async def handler(raw_arguments: Dict[str, Any]) -> str:
+        try:
+            with telemetry.span("tool_call", tool.name):
+                result = await asyncio.wait_for(tool.ainvoke(raw_arguments), timeout)
+        except asyncio.TimeoutError:
+            return f"Error: Tool {tool.name} timed out after {timeout:g} seconds."
+        except Exception as e:
+            return f"Error: Tool {tool.name} failed: {str(e)}"
+        return truncate_tool_result(str(result), budget)
+
+    return function_tool(handler, raw_schema=schema["function"])
+
+
+def _build_tools(agent_slug: str, config: Dict[str, Any]) -> List[Any]:
+    """The agent's standard and custom tools, as /api/chat builds them."""
+    from core.chat_engine import DEFAULT_TOOL_TIMEOUT_SECONDS
+    from core.context_budget import ContextBudget
+    from core.tool_factory import get_compiled_toolset
+
+    toolset = get_compiled_toolset(agent_slug, config)
+    timeout = config.get("tool_timeout_seconds") or DEFAULT_TOOL_TIMEOUT_SECONDS
+    budget = ContextBudget(config)
+    return [_voice_tool(tool, schema, timeout, budget) for tool, schema in zip(toolset.tools, toolset.schemas)]
+
+
+class _LatencyTracker:
+    """
+    Joins the per-stage metrics of one reply (keyed by speech_id) into
+    mouth-to-ear latency: end-of-utterance delay + LLM time to first token
+    + TTS time to first byte.
+    """
+
+    def __init__(self, agent_slug: str):
+        self.agent_slug = agent_slug
+        self._parts: Dict[str, Dict[str, float]] = {}
+
+    def on_metrics(self, ev) -> None:
+        m = ev.metrics
+        if isinstance(m, lk_metrics.EOUMetrics):
+            self._add(m.speech_id, "voice_eou", m.end_of_utterance_delay)
+        elif isinstance(m, lk_metrics.LLMMetrics):
+            self._add(m.speech_id, "voice_llm_ttft", m.ttft)
+        elif isinstance(m, lk_metrics.TTSMetrics):
+            self._add(m.speech_id, "voice_tts_ttfb", m.ttfb)
+
+    def _add(self, speech_id: Optional[str], stage: str, seconds: float) -> None:
+        if seconds is None or seconds < 0:
+            return
+        telemetry.observe(stage, seconds, self.agent_slug)
+        if not speech_id:
+            return
+        parts = self._parts.setdefault(speech_id, {})
+        # Tool rounds produce several LLM/TTS metrics per reply; the first counts
+        parts.setdefault(stage, seconds)
+        if len(parts) == 3:
+            total = sum(self._parts.pop(speech_id).values())
+            telemetry.observe("voice_mouth_to_ear", total, self.agent_slug)
+            log.debug("Mouth-to-ear for %s: %.0f ms", self.agent_slug, total * 1000)
+        # Replies without user speech (greeting) never complete; keep it bounded
+        while len(self._parts) > 32:
+            self._parts.pop(next(iter(self._parts)))
+
 
 async def entrypoint(ctx: JobContext):
     """Main entrypoint for voice agent using Agent + AgentSession pattern"""
-    
+    _start_config_refresher()
+
     # 1. Connect to the Room
-    print(f"🔌 Connecting to room {ctx.room.name}...")
+    log.info("Connecting to room %s", ctx.room.name)
     await ctx.connect(auto_subscribe=AutoSubscribe.AUDIO_ONLY)
-    
-    # 2. Wait for the user to join
-    participant = await ctx.wait_for_participant()
-    print(f"👤 User {participant.identity} joined.")
-    
-    # 3. Determine Agent Personality (from Room Name or attributes)
-    # Extract agent slug from room name (format: chat-{agent_slug})
-    room_name = ctx.room.name
-    agent_slug = room_name.replace("chat-", "") if room_name.startswith("chat-") else "general"
-    
-    # Fallback: Check participant attributes
-    if not agent_slug or agent_slug == ctx.room.name:
-        agent_slug = participant.attributes.get("agent_slug", "general")
-    
-    # 4. Fetch System Prompt from Supabase
-    try:
-        config = get_agent_config(agent_slug)
-        system_prompt = config.get("system_prompt", "You are a helpful assistant.")
-        agent_name = config.get("name", "AI Assistant")
-        print(f"✅ Loaded config for: {agent_name}")
-    except Exception as e:
-        print(f"⚠️  Could not load config for {agent_slug}, using default. Error: {e}")
-        system_prompt = "You are a helpful assistant."
-        agent_name = "AI Assistant"
-    
-    print(f"🎤 Starting Voice Agent: {agent_slug}")
-    
+
+    # 2. Note when the user joins; the session is set up meanwhile
+    joined = {}
+    participant_task = asyncio.ensure_future(ctx.wait_for_participant())
+    participant_task.add_done_callback(lambda _: joined.setdefault("at", time.perf_counter()))
+
+    # 3. Determine Agent Personality from the room name, falling back to
+    #    participant attributes
+    agent_slug = _slug_from_room(ctx.room.name)
+    if agent_slug is None:
+        participant = await participant_task
+        agent_slug = participant.attributes.get("agent_slug") or "general"
+
+    # 4. Fetch System Prompt
+    config = await _load_config(agent_slug)
+    agent_name = config.get("name", "AI Assistant")
+    log.info("Starting voice agent %s (%s)", agent_slug, agent_name)
+
     # 5. Initialize the Agent Logic (The "Brain")
-    # This holds the instructions and conversation state
+    # This holds the instructions, the agent's tools and conversation state
+    with telemetry.span("toolset_build", agent_slug):
+        tools = _build_tools(agent_slug, config) if config.get("slug") else []
     agent_logic = Agent(
-        instructions=system_prompt,
-        # tools=[...]  # You can inject tools here later
+        instructions=config.get("system_prompt") or DEFAULT_SYSTEM_PROMPT,
+        tools=tools,
     )
-    
+
     # 6. Initialize the Session (The "Body")
     # This manages the STT -> LLM -> TTS pipeline
+    from core.chat_engine import DEFAULT_MAX_ITERATIONS
     session = AgentSession(
-        vad=silero.VAD.load(),              # Voice Activity Detection
-        stt=deepgram.STT(),                 # Deepgram for Speech-to-Text (fastest!)
-        llm=openai.LLM(model="gpt-3.5-turbo"),  # OpenAI for Language Model
-        tts=openai.TTS(voice="alloy"),      # OpenAI for Text-to-Speech
+        vad=ctx.proc.userdata["vad"],            # Loaded once in prewarm
+        stt=ctx.proc.userdata["stt"],            # Deepgram for Speech-to-Text (fastest!)
+        llm=_build_llm(config),                  # The agent's model and temperature
+        tts=_build_tts(config),                  # The agent's voice, sentence by sentence
+        max_tool_steps=config.get("max_iterations") or DEFAULT_MAX_ITERATIONS,
     )
-    
-    # 7. Event Listeners (Optional Debugging)
-    @session.on("user_speech_committed")
-    def on_user_speech(msg):
-        print(f"👤 User: {msg.content}")
-    
-    @session.on("agent_speech_committed")
-    def on_agent_speech(msg):
-        print(f"🤖 Agent: {msg.content}")
-    
+
+    # 7. Measure participant join -> first greeting audio
+    greeting = {}
+
+    @session.on("agent_state_changed")
+    def on_agent_state(ev):
+        if ev.new_state != "speaking" or "reported" in greeting or "at" not in joined:
+            return
+        greeting["reported"] = True
+        seconds = time.perf_counter() - joined["at"]
+        telemetry.observe("voice_first_audio", seconds, agent_slug)
+        log.info("First greeting audio for %s %.0f ms after join", agent_slug, seconds * 1000)
+
+    latency = _LatencyTracker(agent_slug)
+    session.on("metrics_collected", latency.on_metrics)
+
+    @session.on("conversation_item_added")
+    def on_conversation_item(ev):
+        log.debug("%s: %s", ev.item.role, ev.item.text_content)
+
     # 8. Start the Agent
-    # This wires the Brain (agent_logic) to the Body (session) and the Room
-    print(f"🚀 Starting session for {agent_name}...")
-    await session.start(agent=agent_logic, room=ctx.room)
-    
+    # Starting before the user arrives opens the LLM/TTS connections while
+    # they are still joining
+    with telemetry.span("voice_session_start", agent_slug):
+        await session.start(agent=agent_logic, room=ctx.room)
+
+    participant = await participant_task
+    log.info("User %s joined", participant.identity)
+
     # 9. Say Hello
-    await session.generate_reply(instructions="Say a brief, friendly greeting.")
-    print(f"✨ Voice session is live!")
+    session.generate_reply(instructions="Say a brief, friendly greeting.")
+    log.info("Voice session is live")
 
 
 if __name__ == "__main__":
     # Set LIVEKIT_URL for internal Docker networking
     os.environ["LIVEKIT_URL"] = "ws://livekit:7880"
-    
+
     # Run the worker
     cli.run_app(
         WorkerOptions(
             entrypoint_fnc=entrypoint,
+            prewarm_fnc=prewarm,
         )
     )
@@ -0,0 +1,6 @@
+-- Per-agent limits for executing the tool calls of a single LLM turn
+ALTER TABLE agent_configs 
+ADD COLUMN IF NOT EXISTS max_tool_concurrency integer DEFAULT 4;
+
+ALTER TABLE agent_configs 
+ADD COLUMN IF NOT EXISTS tool_timeout_seconds float DEFAULT 30;
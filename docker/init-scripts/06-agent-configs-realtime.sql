@@ -0,0 +1,19 @@
+-- Broadcast agent_configs changes over Supabase realtime so backends can
+-- invalidate their cached configs per slug.
+
+-- Include the full old row in UPDATE/DELETE events (needed to know the slug)
+ALTER TABLE agent_configs REPLICA IDENTITY FULL;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_publication WHERE pubname = 'supabase_realtime') THEN
+        CREATE PUBLICATION supabase_realtime;
+    END IF;
+
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_publication_tables
+        WHERE pubname = 'supabase_realtime' AND tablename = 'agent_configs'
+    ) THEN
+        ALTER PUBLICATION supabase_realtime ADD TABLE agent_configs;
+    END IF;
+END $$;
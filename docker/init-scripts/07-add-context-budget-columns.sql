@@ -0,0 +1,13 @@
+-- Per-agent prompt size limits (NULL = backend defaults)
+-- context_strategy: 'summarize' older turns or 'drop' them
+ALTER TABLE agent_configs 
+ADD COLUMN IF NOT EXISTS context_max_tokens integer DEFAULT 12000;
+
+ALTER TABLE agent_configs 
+ADD COLUMN IF NOT EXISTS context_keep_recent integer DEFAULT 6;
+
+ALTER TABLE agent_configs 
+ADD COLUMN IF NOT EXISTS context_strategy text DEFAULT 'summarize';
+
+ALTER TABLE agent_configs 
+ADD COLUMN IF NOT EXISTS tool_result_max_tokens integer DEFAULT 2000;
@@ -0,0 +1,11 @@
+-- Opt-in answer cache for deterministic agents (only used when temperature = 0)
+-- response_cache_similarity: NULL = exact matches only, e.g. 0.9 also serves
+-- answers to near-identical questions
+ALTER TABLE agent_configs 
+ADD COLUMN IF NOT EXISTS response_cache_enabled boolean DEFAULT false;
+
+ALTER TABLE agent_configs 
+ADD COLUMN IF NOT EXISTS response_cache_ttl_seconds integer DEFAULT 3600;
+
+ALTER TABLE agent_configs 
+ADD COLUMN IF NOT EXISTS response_cache_similarity float;
@@ -0,0 +1,11 @@
+-- Per-request limits for the ReAct tool loop; when one runs out the agent
+-- gives a final answer without further tool calls
+-- max_request_tokens: prompt + completion tokens over all LLM calls (0 = unlimited)
+ALTER TABLE agent_configs 
+ADD COLUMN IF NOT EXISTS max_iterations integer DEFAULT 8;
+
+ALTER TABLE agent_configs 
+ADD COLUMN IF NOT EXISTS request_deadline_seconds float DEFAULT 120;
+
+ALTER TABLE agent_configs 
+ADD COLUMN IF NOT EXISTS max_request_tokens integer DEFAULT 0;
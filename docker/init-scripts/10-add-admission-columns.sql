@@ -0,0 +1,3 @@
+-- Concurrent chat requests per agent before new ones queue (NULL = backend default)
+ALTER TABLE agent_configs 
+ADD COLUMN IF NOT EXISTS max_concurrent_requests integer;
@@ -0,0 +1,3 @@
+-- TTS voice used by the voice worker (NULL = VOICE_DEFAULT_TTS_VOICE, e.g. 'alloy', 'nova', 'shimmer')
+ALTER TABLE agent_configs 
+ADD COLUMN IF NOT EXISTS tts_voice text;
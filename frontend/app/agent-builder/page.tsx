@@ -312,6 +312,26 @@ export default function AgentBuilder() {
                                     />
                                     <span className="text-sm text-zinc-300">Web Scraper (Smart Scrape)</span>
                                 </label>
+
+                                <label className="flex items-center gap-3 rounded-lg border border-zinc-800 bg-zinc-900 p-3 transition-colors hover:border-zinc-700">
+                                    <input
+                                        type="checkbox"
+                                        checked={selectedAgent.tools?.includes("web_scraper_batch") || false}
+                                        onChange={(e) => {
+                                            const tools = selectedAgent.tools || [];
+                                            if (e.target.checked) {
+                                                setSelectedAgent({ ...selectedAgent, tools: [...tools, "web_scraper_batch"] });
+                                            } else {
+                                                setSelectedAgent({
+                                                    ...selectedAgent,
+                                                    tools: tools.filter((t) => t !== "web_scraper_batch"),
+                                                });
+                                            }
+                                        }}
+                                        className="h-4 w-4 rounded border-zinc-700 bg-zinc-800 text-blue-600 focus:ring-blue-600"
+                                    />
+                                    <span className="text-sm text-zinc-300">Batch Web Scraper (Multi-URL)</span>
+                                </label>
                             </div>
 
                             {/* Custom Tools Section */}
@@ -24,8 +24,17 @@ export default function ChatInterface() {
     const [selectedAgentSlug, setSelectedAgentSlug] = useState<string>("general");
     const [isVoiceMode, setIsVoiceMode] = useState(false);
     const [isAutoPilot, setIsAutoPilot] = useState(false);
+    // The backend keeps the transcript; each request only carries the new message
+    const [sessionId, setSessionId] = useState(() => crypto.randomUUID());
     const messagesEndRef = useRef<HTMLDivElement>(null);
 
+    // A new conversation needs a new server-side session, or the old
+    // transcript would be sent along with the next message
+    const startNewChat = () => {
+        setMessages([]);
+        setSessionId(crypto.randomUUID());
+    };
+
     const scrollToBottom = () => {
         messagesEndRef.current?.scrollIntoView({ behavior: "smooth" });
     };
@@ -76,7 +85,8 @@ export default function ChatInterface() {
                     "Content-Type": "application/json",
                 },
                 body: JSON.stringify({
-                    messages: [...messages, userMessage],
+                    session_id: sessionId,
+                    message: userMessage.content,
                     agent_slug: isAutoPilot ? "auto" : selectedAgentSlug,
                 }),
             });
@@ -160,7 +170,7 @@ export default function ChatInterface() {
                                     value={selectedAgentSlug}
                                     onChange={(e) => {
                                         setSelectedAgentSlug(e.target.value);
-                                        setMessages([]); // Clear chat on agent switch
+                                        startNewChat(); // Clear chat on agent switch
                                     }}
                                     className="w-full appearance-none rounded-lg border border-slate-800 bg-slate-900/50 px-4 py-2 text-sm text-slate-300 outline-none transition-all hover:border-slate-700 focus:border-blue-600/50"
                                 >
@@ -178,7 +188,7 @@ export default function ChatInterface() {
 
                 <div className="space-y-2">
                     <button
-                        onClick={() => setMessages([])}
+                        onClick={startNewChat}
                         className="w-full rounded-lg border border-slate-800 bg-slate-900/50 px-4 py-2 text-sm text-slate-300 transition-all hover:border-slate-700 hover:bg-slate-800/50"
                     >
                         New Chat